@@ -0,0 +1,52 @@
+# Import hashlib to turn the validator values into a short ETag
+import hashlib
+# Import Django's helper that evaluates If-None-Match against an ETag
+from django.utils.cache import get_conditional_response
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag (a quoted hash) from any values that describe
+    the current state of a resource, e.g. row count and newest update time.
+    """
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+class ConditionalGetMixin:
+    """
+    Mixin that adds ETag / If-None-Match support to list and retrieve.
+
+    Views implement get_etag(request) and return a value computed from
+    cheap queries (counts, max(updated_at)) - never from the serialized body.
+    If the client sends If-None-Match with the same ETag we answer
+    304 Not Modified and skip fetching and serializing the data entirely.
+
+    Returning None from get_etag disables the check for that request.
+    """
+
+    def get_etag(self, request):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        # Returns a 304 response when the client's copy is still current
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        # Otherwise build the normal response and tag it for the next request
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+        return response
@@ -5,7 +5,18 @@ from django.db import models
 class Book(models.Model):
     title = models.CharField(max_length=200)
     author = models.CharField(max_length=100)
-    publication_year = models.IntegerField()
+    # Indexed so ?publication_year=... filters don't scan the whole table
+    publication_year = models.IntegerField(db_index=True)
+    # Set automatically on every save; used to build ETags for conditional GETs
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves ?author=... on its own (leftmost column of the index)
+            # as well as ?author=...&publication_year=... together,
+            # so author does not need a separate index
+            models.Index(fields=['author', 'publication_year'], name='book_author_year_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} by {self.author} ({self.publication_year})'
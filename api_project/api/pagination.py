@@ -0,0 +1,27 @@
+# Import the cursor-based paginator from Django REST Framework
+from rest_framework.pagination import CursorPagination
+
+
+class BookCursorPagination(CursorPagination):
+    """
+    Cursor pagination for book lists.
+
+    Unlike page numbers (which need a COUNT(*) and an OFFSET that gets slower
+    the deeper you go), a cursor remembers the last id that was returned and
+    the next page is simply "WHERE id > last_id ORDER BY id LIMIT n".
+    Every page costs the same, even a million rows in.
+
+    Responses look like: {"next": "...?cursor=cD0xMDA%3D", "previous": null, "results": [...]}
+    """
+
+    # Order by the primary key: unique, indexed and never changes
+    ordering = 'id'
+
+    # Default number of books per page
+    page_size = 50
+
+    # Clients may ask for a different page size with ?page_size=...
+    page_size_query_param = 'page_size'
+
+    # ...but never more than this, so one request can't dump the whole table
+    max_page_size = 200
@@ -0,0 +1,40 @@
+# Import json to decode each line of an NDJSON body
+import json
+# Import the base class for DRF parsers and the "bad request body" error
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser for newline-delimited JSON (one JSON value per line), e.g.
+
+        {"title": "Emma", "author": "Jane Austen", "publication_year": 1815}
+        {"title": "Persuasion", "author": "Jane Austen", "publication_year": 1817}
+
+    Instead of reading the whole body into memory it returns a generator:
+    each line is read and decoded only when the view asks for the next item,
+    so a 100k-line import is processed chunk by chunk as it arrives.
+
+    A line that is not valid JSON is yielded as a ParseError (instead of
+    failing the whole request) so the view can report it as an item error.
+    Blank lines are skipped.
+    """
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return self._iter_lines(stream)
+
+    def _iter_lines(self, stream):
+        if stream is None:
+            return
+
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                yield ParseError(f'Line {line_number}: invalid JSON ({exc}).')
@@ -1,17 +1,120 @@
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.settings import api_settings
 from .models import Book
 
+
+class BookListSerializer(serializers.ListSerializer):
+    """
+    Bulk version of BookSerializer, used when it is created with many=True.
+
+    The default ListSerializer rejects the whole list if one item is invalid.
+    For bulk imports we want the opposite: validate_items() splits a chunk
+    into valid data and per-item errors, and create() / update() write all
+    the valid items of a chunk with a single bulk query.
+    """
+
+    @staticmethod
+    def item_id(item):
+        """
+        The book id of a bulk item: {"id": 5}, or just 5 for deletes.
+        Returns None if it is missing or not a whole number.
+        """
+        value = item.get('id') if isinstance(item, dict) else item
+        if isinstance(value, bool):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def validate_items(self, items, offset=0, instances=None):
+        """
+        Validate a chunk of items one by one.
+
+        `offset` is the position of the chunk in the whole request, so error
+        indexes point at the right item. For updates pass `instances`
+        ({id: Book}); every item must then carry the id of one of them.
+
+        Returns (valid data, errors) where errors look like
+        [{"index": 3, "errors": {"publication_year": ["A valid integer is required."]}}]
+        """
+        valid, errors = [], []
+        for index, item in enumerate(items, start=offset):
+            try:
+                # An NDJSON line that could not be decoded (see api/parsers.py),
+                # reported like any other non-field error
+                if isinstance(item, ParseError):
+                    raise serializers.ValidationError({
+                        api_settings.NON_FIELD_ERRORS_KEY: [item.detail]
+                    })
+
+                data = self.child.run_validation(item)
+                if instances is not None:
+                    book_id = self.item_id(item)
+                    if book_id not in instances:
+                        message = 'This field is required.' if book_id is None else 'Not found.'
+                        raise serializers.ValidationError({'id': [message]})
+                    data['id'] = book_id
+                valid.append(data)
+            except serializers.ValidationError as exc:
+                errors.append({'index': index, 'errors': exc.detail})
+        return valid, errors
+
+    def create(self, validated_data):
+        # One INSERT for the whole chunk instead of one per book
+        return Book.objects.bulk_create([Book(**data) for data in validated_data])
+
+    def update(self, instances, validated_data):
+        """
+        Apply validated changes to `instances` ({id: Book}) with one UPDATE.
+        """
+        now = timezone.now()
+        changed_fields = {'updated_at'}
+        books = []
+        for data in validated_data:
+            book = instances[data.pop('id')]
+            for field, value in data.items():
+                setattr(book, field, value)
+                changed_fields.add(field)
+            # bulk_update() does not run auto_now, so set it ourselves
+            # (the ETags in views.py depend on it)
+            book.updated_at = now
+            books.append(book)
+
+        Book.objects.bulk_update(books, sorted(changed_fields))
+        return books
+
+
 class BookSerializer(serializers.ModelSerializer):
     """
     Serializer for the Book model.
     Converts Book model instances to JSON format (serialization)
     and JSON data to Book model instances (deserialization).
+
+    Accepts an optional `fields` argument (a list of field names) to output
+    only those fields, e.g. BookSerializer(books, many=True, fields=['id', 'title']).
+    The views use it for the ?fields=... query parameter.
     """
+
+    def __init__(self, *args, **kwargs):
+        # Pop our custom argument before ModelSerializer sees it
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            # Drop every field that was not asked for
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
     
     class Meta:
         # Specify which model this serializer is for
         model = Book
         
-        # Include all fields from the Book model
-        # This will automatically include: id, title, author, publication_year
-        fields = '__all__'
\ No newline at end of file
+        # List the fields explicitly (instead of '__all__') so the views know
+        # which names are valid in ?fields=...
+        fields = ['id', 'title', 'author', 'publication_year', 'updated_at']
+
+        # Used instead of the default ListSerializer for many=True
+        list_serializer_class = BookListSerializer
\ No newline at end of file
@@ -1,3 +1,246 @@
-from django.test import TestCase
+# Import csv / json to read the export bodies back
+import csv
+import io
+import json
+# Import the test case class and a helper to patch module constants
+from unittest import mock
+from django.contrib.auth.models import User
+# AsyncClient sends requests the way an ASGI server (uvicorn) does
+from django.test import AsyncClient, TestCase
+# Records the SQL a block of code runs
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+# Import DRF's test client, which can authenticate without a token
+from rest_framework.test import APIClient
+# Import our Book model and the views module (for BULK_CHUNK_SIZE)
+from .models import Book
+from . import views
 
-# Create your tests here.
+BULK_URL = '/api/books_all/bulk/'
+LIST_URL = '/api/books_all/'
+
+
+# Two items per chunk, so every request below spans several chunks and the
+# error indexes must count items from the start of the request, not the chunk
+@mock.patch.object(views, 'BULK_CHUNK_SIZE', 2)
+class BookBulkTests(TestCase):
+    """
+    Bulk create / update / delete: valid items are written, invalid ones are
+    reported with their position in the request.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('writer'))
+        self.books = [
+            Book.objects.create(title=f'Book {number}', author='Author', publication_year=2000 + number)
+            for number in range(3)
+        ]
+
+    def test_requires_authentication(self):
+        response = APIClient().post(BULK_URL, [], format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_rejects_non_list_body(self):
+        response = self.client.post(BULK_URL, {'title': 'Emma'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_create(self):
+        items = [
+            {'title': 'Emma', 'author': 'Jane Austen', 'publication_year': 1815},
+            {'title': 'Persuasion', 'author': 'Jane Austen', 'publication_year': 1817},
+            {'title': 'No year', 'author': 'Jane Austen'},
+            {'title': 'Sanditon', 'author': 'Jane Austen', 'publication_year': 'soon'},
+            {'title': 'Lady Susan', 'author': 'Jane Austen', 'publication_year': 1871},
+        ]
+        response = self.client.post(BULK_URL, items, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([error['index'] for error in response.data['errors']], [2, 3])
+        self.assertIn('publication_year', response.data['errors'][0]['errors'])
+        self.assertTrue(Book.objects.filter(title='Lady Susan').exists())
+        self.assertFalse(Book.objects.filter(title='Sanditon').exists())
+
+    def test_create_ndjson(self):
+        body = (
+            '{"title": "Emma", "author": "Jane Austen", "publication_year": 1815}\n'
+            '\n'
+            'not json\n'
+            '{"title": "Persuasion", "author": "Jane Austen", "publication_year": 1817}\n'
+        )
+        response = self.client.post(BULK_URL, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        # Blank lines are skipped, so the bad line is item 1 (line 3)
+        [error] = response.data['errors']
+        self.assertEqual(error['index'], 1)
+        self.assertIn('Line 3', str(error['errors']['non_field_errors'][0]))
+
+    def test_update(self):
+        first, second, third = self.books
+        items = [
+            {'id': first.id, 'title': 'Renamed'},
+            {'title': 'No id'},
+            {'id': 999999, 'title': 'Missing'},
+            {'id': second.id, 'publication_year': 'never'},
+            {'id': third.id, 'publication_year': 1999},
+        ]
+        response = self.client.patch(BULK_URL, items, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        errors = {error['index']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [1, 2, 3])
+        self.assertEqual(errors[1]['id'], ['This field is required.'])
+        self.assertEqual(errors[2]['id'], ['Not found.'])
+        self.assertIn('publication_year', errors[3])
+
+        first.refresh_from_db()
+        third.refresh_from_db()
+        self.assertEqual(first.title, 'Renamed')
+        self.assertEqual(third.publication_year, 1999)
+
+    def test_delete(self):
+        first, second, third = self.books
+        items = [first.id, 'abc', 999999, {'id': second.id}]
+        response = self.client.delete(BULK_URL, items, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertEqual(
+            response.data['errors'],
+            [
+                {'index': 1, 'errors': {'id': ['A valid integer is required.']}},
+                {'index': 2, 'errors': {'id': ['Not found.']}},
+            ]
+        )
+        self.assertEqual(list(Book.objects.values_list('id', flat=True)), [third.id])
+
+
+class BookListTests(TestCase):
+    """
+    Cursor pagination, the indexed filters, ?fields=... and the ETags.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.books = [
+            Book.objects.create(title='Emma', author='Jane Austen', publication_year=1815),
+            Book.objects.create(title='Persuasion', author='Jane Austen', publication_year=1817),
+            Book.objects.create(title='Northanger Abbey', author='Jane Austen', publication_year=1817),
+            Book.objects.create(title='Dracula', author='Bram Stoker', publication_year=1897),
+            Book.objects.create(title='Frankenstein', author='Mary Shelley', publication_year=1818),
+        ]
+
+    def titles(self, query):
+        response = self.client.get(f'{LIST_URL}{query}')
+        self.assertEqual(response.status_code, 200)
+        return [book['title'] for book in response.data['results']]
+
+    def test_cursor_pagination(self):
+        titles, url = [], f'{LIST_URL}?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.data['results']), 2)
+            titles += [book['title'] for book in response.data['results']]
+            url = response.data['next']
+
+        # Every book exactly once, in id order
+        self.assertEqual(titles, [book.title for book in self.books])
+
+    def test_filters(self):
+        self.assertEqual(self.titles('?author=Bram Stoker'), ['Dracula'])
+        self.assertEqual(
+            self.titles('?author=Jane Austen&publication_year=1817'),
+            ['Persuasion', 'Northanger Abbey']
+        )
+        self.assertEqual(
+            self.titles('?publication_year__gte=1817&publication_year__lte=1818'),
+            ['Persuasion', 'Northanger Abbey', 'Frankenstein']
+        )
+
+        response = self.client.get(f'{LIST_URL}?publication_year=recent')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('publication_year', response.data)
+
+    def test_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'{LIST_URL}?fields=title')
+
+        self.assertEqual(response.data['results'][0], {'title': 'Emma'})
+        # .only(): the unrequested columns are not selected
+        select = next(query['sql'] for query in queries if 'ORDER BY' in query['sql'])
+        self.assertIn('"title"', select)
+        self.assertNotIn('"author"', select)
+
+    def test_unknown_field(self):
+        response = self.client.get(f'{LIST_URL}?fields=title,isbn')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['fields'], 'Unknown field(s): isbn')
+
+    def test_detail_etag_depends_on_fields(self):
+        url = f'{LIST_URL}{self.books[0].id}/'
+        full = self.client.get(url)['ETag']
+        partial = self.client.get(f'{url}?fields=id')['ETag']
+        self.assertNotEqual(full, partial)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=full).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=partial).status_code, 200)
+
+
+class BookExportTests(TestCase):
+    """
+    The export streams every matching book, with the list's filters and
+    ?fields=..., as NDJSON or CSV.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.books = [
+            Book.objects.create(title='Emma', author='Jane Austen', publication_year=1815),
+            Book.objects.create(title='Persuasion', author='Jane Austen', publication_year=1817),
+            Book.objects.create(title='Dracula', author='Bram Stoker', publication_year=1897),
+        ]
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/books_all/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, body = self.export()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Emma', 'Persuasion', 'Dracula'])
+        self.assertEqual(rows[0]['publication_year'], 1815)
+
+    def test_csv_with_fields(self):
+        response, body = self.export('?output=csv&fields=title,publication_year')
+
+        self.assertIn('filename="books.csv"', response['Content-Disposition'])
+        self.assertEqual(
+            list(csv.reader(io.StringIO(body))),
+            [['title', 'publication_year'], ['Emma', '1815'], ['Persuasion', '1817'], ['Dracula', '1897']]
+        )
+
+    def test_filters(self):
+        _, body = self.export('?author=Jane Austen&publication_year__gte=1816&fields=title')
+        self.assertEqual([json.loads(line) for line in body.splitlines()], [{'title': 'Persuasion'}])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/books_all/export/?output=xml').status_code, 400)
+        self.assertEqual(self.client.get('/api/books_all/export/?fields=isbn').status_code, 400)
+
+    async def test_asgi_streams_async_iterator(self):
+        response = await AsyncClient().get('/api/books_all/export/?fields=id')
+
+        # An async iterator: Django does not buffer the body first
+        self.assertTrue(response.is_async)
+        body = b''.join([piece async for piece in response.streaming_content]).decode()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in body.splitlines()],
+            [book.id for book in self.books]
+        )
@@ -4,13 +4,142 @@ from rest_framework import generics
 from rest_framework import viewsets
 # Import permissions to control access
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
+# Import aggregates used to compute cheap ETags
+from django.db.models import Count, Max
 # Import our Book model
 from .models import Book
-# Import our BookSerializer
-from .serializers import BookSerializer
+# Import the ETag / 304 Not Modified helpers
+from .conditional import ConditionalGetMixin, make_etag
+# Import our BookSerializer (and its bulk list version)
+from .serializers import BookListSerializer, BookSerializer
+# Import the cursor paginator used by the book lists
+from .pagination import BookCursorPagination
+# Import the exception DRF turns into a 400 Bad Request response
+from rest_framework.exceptions import ValidationError
+# Import helpers for the bulk endpoint
+from itertools import islice
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from .parsers import NDJSONParser
+# Import the streaming NDJSON / CSV export helper
+from .export import export_response
 
+# Bulk items written per transaction (one INSERT/UPDATE/DELETE each).
+# Big enough to make the per-query overhead negligible, small enough that
+# a transaction never holds its locks for long.
+BULK_CHUNK_SIZE = 1000
 
-class BookList(generics.ListAPIView):
+
+def chunked(items, size):
+    """
+    Split any iterable (a list or a streaming NDJSON generator) into lists
+    of at most `size` items, yielding (offset of the chunk, chunk).
+    """
+    iterator = iter(items)
+    offset = 0
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def book_list_etag(request):
+    """
+    ETag for a list of books.
+
+    One aggregate query: adding a book changes the count and max id,
+    editing a book changes max(updated_at), deleting one changes the count.
+    The full path is included so different pages/filters get different ETags.
+    """
+    stats = Book.objects.aggregate(
+        total=Count('id'),
+        newest=Max('id'),
+        last_updated=Max('updated_at')
+    )
+    return make_etag(
+        'books',
+        stats['total'],
+        stats['newest'],
+        stats['last_updated'],
+        request.get_full_path()
+    )
+
+
+class BookQueryMixin:
+    """
+    Shared list behaviour for BookList and BookViewSet.
+
+    - Cursor pagination (see api/pagination.py)
+    - Filters backed by indexes on the Book model:
+        ?author=Jane Austen
+        ?publication_year=1813
+        ?publication_year__gte=1800&publication_year__lte=1900
+    - Sparse fieldsets: ?fields=id,title returns only those fields AND only
+      selects those columns in SQL (via .only()), so large catalogs don't
+      read or send data nobody asked for.
+    """
+
+    pagination_class = BookCursorPagination
+
+    # Query parameter -> ORM lookup, and the type of its value
+    filter_params = {
+        'author': ('author', str),
+        'publication_year': ('publication_year', int),
+        'publication_year__gte': ('publication_year__gte', int),
+        'publication_year__lte': ('publication_year__lte', int),
+    }
+
+    def get_requested_fields(self):
+        """
+        Field names from ?fields=..., or None when all fields are wanted.
+        """
+        param = self.request.query_params.get('fields')
+        if not param:
+            return None
+
+        fields = [name.strip() for name in param.split(',') if name.strip()]
+        unknown = set(fields) - set(BookSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError({'fields': f'Unknown field(s): {", ".join(sorted(unknown))}'})
+        return fields
+
+    def get_queryset(self):
+        queryset = Book.objects.all()
+
+        # Filters and column narrowing only apply to reads: an update must
+        # load (and save) the full row
+        if self.request.method not in ('GET', 'HEAD'):
+            return queryset
+
+        lookups = {}
+        for param, (lookup, cast) in self.filter_params.items():
+            value = self.request.query_params.get(param)
+            if value is None:
+                continue
+            try:
+                lookups[lookup] = cast(value)
+            except ValueError:
+                raise ValidationError({param: 'Enter a whole number.'})
+        queryset = queryset.filter(**lookups)
+
+        fields = self.get_requested_fields()
+        if fields is not None:
+            # The primary key is always loaded: the cursor paginator needs it
+            queryset = queryset.only('id', *fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method in ('GET', 'HEAD'):
+            kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+
+class BookList(BookQueryMixin, ConditionalGetMixin, generics.ListAPIView):
     """
     API view that returns a list of all books in the database.
     
@@ -19,9 +148,13 @@ class BookList(generics.ListAPIView):
     - Only authenticated users could modify (but this view doesn't allow modifications)
     
     URL: /api/books/
+
+    Paginated, filterable and supports ?fields=... (see BookQueryMixin).
+
+    Supports conditional GET: responses carry an ETag and a request with
+    a matching If-None-Match header gets 304 Not Modified.
     """
     
-    queryset = Book.objects.all()
     serializer_class = BookSerializer
     
     # Override the default permission for this view
@@ -30,8 +163,11 @@ class BookList(generics.ListAPIView):
     # - Only authenticated users to write (POST, PUT, DELETE)
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    def get_etag(self, request):
+        return book_list_etag(request)
 
-class BookViewSet(viewsets.ModelViewSet):
+
+class BookViewSet(BookQueryMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     A ViewSet for performing ALL CRUD operations on Book objects.
     
@@ -44,15 +180,18 @@ class BookViewSet(viewsets.ModelViewSet):
     - Only registered users can modify the collection
     
     Endpoints:
-    - GET    /api/books_all/        - List all books (public)
+    - GET    /api/books_all/        - List books, paginated and filterable (public)
     - POST   /api/books_all/        - Create book (requires auth)
     - GET    /api/books_all/{id}/   - Get specific book (public)
     - PUT    /api/books_all/{id}/   - Update book (requires auth)
     - PATCH  /api/books_all/{id}/   - Partial update (requires auth)
     - DELETE /api/books_all/{id}/   - Delete book (requires auth)
+    - POST/PATCH/DELETE /api/books_all/bulk/ - Bulk create/update/delete (requires auth)
+    - GET    /api/books_all/export/ - Stream all books as NDJSON or CSV (public)
+
+    List and retrieve support conditional GET (ETag / If-None-Match -> 304).
     """
     
-    queryset = Book.objects.all()
     serializer_class = BookSerializer
     
     # Set permissions for this ViewSet
@@ -60,3 +199,114 @@ class BookViewSet(viewsets.ModelViewSet):
     # - GET requests (list, retrieve) work for everyone
     # - POST, PUT, PATCH, DELETE require authentication
     permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get_etag(self, request):
+        # List: one aggregate over the whole table
+        if self.action == 'list':
+            return book_list_etag(request)
+
+        # Retrieve: only the book's updated_at is needed, not the full row.
+        # A missing book returns None so the normal 404 is raised.
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            updated_at = Book.objects.filter(pk=lookup).values_list('updated_at', flat=True).first()
+        except ValueError:
+            return None
+        if updated_at is None:
+            return None
+        # ?fields=... changes the body, so it is part of the ETag: a cached
+        # ?fields=id copy must not validate the full representation
+        return make_etag('book', lookup, updated_at, self.get_requested_fields())
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every book as NDJSON or CSV: GET /api/books_all/export/?output=csv
+
+        Takes the same filters and ?fields=... as the list, but is not
+        paginated: the whole result is streamed (see api/export.py).
+        """
+        fields = self.get_requested_fields() or BookSerializer.Meta.fields
+        queryset = self.get_queryset().order_by('id')
+        return export_response(request, queryset, fields, 'books')
+
+    @action(
+        detail=False,
+        methods=['post', 'patch', 'delete'],
+        url_path='bulk',
+        parser_classes=[JSONParser, NDJSONParser]
+    )
+    def bulk(self, request):
+        """
+        Bulk create, update or delete books.
+
+        The body is a JSON array or an NDJSON stream
+        (Content-Type: application/x-ndjson, one item per line):
+
+        - POST   /api/books_all/bulk/ - items are new books
+        - PATCH  /api/books_all/bulk/ - items are {"id": ..., <changed fields>}
+        - DELETE /api/books_all/bulk/ - items are ids (or {"id": ...})
+
+        Items are processed in chunks of BULK_CHUNK_SIZE, each written with a
+        single query inside its own transaction. Invalid items are skipped
+        and reported with their position, e.g.
+        {"created": 998, "errors": [{"index": 5, "errors": {"title": [...]}}]}
+        """
+        items = request.data
+        # A JSON object (or a form) instead of a list of items
+        if hasattr(items, 'keys') or isinstance(items, (str, bytes)):
+            raise ValidationError({'detail': 'Expected a list of items.'})
+
+        if request.method == 'DELETE':
+            return self._bulk_delete(items)
+
+        serializer = self.get_serializer(many=True, partial=request.method == 'PATCH')
+        written, errors = 0, []
+
+        for offset, chunk in chunked(items, BULK_CHUNK_SIZE):
+            with transaction.atomic():
+                if request.method == 'POST':
+                    valid, chunk_errors = serializer.validate_items(chunk, offset)
+                    serializer.create(valid)
+                else:
+                    # Lock the rows being changed until the chunk is written
+                    ids = {serializer.item_id(item) for item in chunk} - {None}
+                    instances = Book.objects.select_for_update().in_bulk(ids)
+                    valid, chunk_errors = serializer.validate_items(chunk, offset, instances)
+                    serializer.update(instances, valid)
+            written += len(valid)
+            errors.extend(chunk_errors)
+
+        if request.method == 'POST':
+            return Response({'created': written, 'errors': errors}, status=status.HTTP_201_CREATED)
+        return Response({'updated': written, 'errors': errors})
+
+    def _bulk_delete(self, items):
+        deleted, errors = 0, []
+
+        for offset, chunk in chunked(items, BULK_CHUNK_SIZE):
+            ids = {}
+            for index, item in enumerate(chunk, start=offset):
+                book_id = BookListSerializer.item_id(item)
+                if book_id is None:
+                    errors.append({'index': index, 'errors': {'id': ['A valid integer is required.']}})
+                else:
+                    ids[index] = book_id
+
+            with transaction.atomic():
+                found = set(
+                    Book.objects.select_for_update()
+                    .filter(id__in=ids.values())
+                    .values_list('id', flat=True)
+                )
+                # One DELETE for the chunk
+                deleted += Book.objects.filter(id__in=found).delete()[0]
+
+            errors.extend(
+                {'index': index, 'errors': {'id': ['Not found.']}}
+                for index, book_id in ids.items()
+                if book_id not in found
+            )
+
+        errors.sort(key=lambda error: error['index'])
+        return Response({'deleted': deleted, 'errors': errors})
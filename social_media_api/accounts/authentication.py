@@ -0,0 +1,119 @@
+"""
+Cached token authentication.
+
+DRF's TokenAuthentication runs `Token JOIN User` on every request. Here an
+AuthToken resolves to its issue/last-use times plus a slim user snapshot
+(the SNAPSHOT_FIELDS values), held in a per-process LRU for a few seconds
+and in the shared Django cache; the database is only read on a miss.
+Expiry is checked against the cached times (see accounts/tokens.py).
+
+request.user is built from the snapshot with every other field deferred,
+so views that need the full profile should load it (see ProfileView).
+
+Entries are keyed by a hash of the token, never the token itself, and are
+dropped when the token is deleted (logout, rotation) or its user is saved
+(e.g. deactivated); see accounts/signals.py. Other processes may keep a
+revoked token for up to TOKEN_CACHE_LOCAL_TTL seconds.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from social_media_api.localcache import LocalCache
+
+from . import tokens
+from .models import AuthToken
+
+User = get_user_model()
+
+# In model field order, as Model.from_db() expects
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {'id', 'username', 'is_active', 'is_staff', 'is_superuser'}
+)
+
+_local = LocalCache(
+    max_entries=lambda: settings.TOKEN_CACHE_LOCAL_MAX_ENTRIES,
+    ttl=lambda: settings.TOKEN_CACHE_LOCAL_TTL
+)
+
+
+def _cache_key(key):
+    return f'accounts-authtoken:{tokens.token_digest(key)}'
+
+
+def _user_from_snapshot(snapshot):
+    # A real User instance; fields outside the snapshot load on first access
+    return User.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, snapshot)
+
+
+def invalidate_tokens(keys):
+    """
+    Forget cached lookups for the given token keys once the current
+    transaction commits.
+    """
+
+    cache_keys = [_cache_key(key) for key in keys]
+    if not cache_keys:
+        return
+
+    def forget():
+        cache.delete_many(cache_keys)
+        _local.delete_many(cache_keys)
+
+    transaction.on_commit(forget)
+
+
+def clear_local():
+    """
+    Empty this process's layer (the shared cache is left alone).
+    """
+
+    _local.clear()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication over AuthToken that resolves tokens through the
+    cache and rejects expired ones.
+    """
+
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+
+        entry = _local.get(cache_key)
+        if entry is None:
+            entry = cache.get(cache_key)
+            if entry is None:
+                entry = self._load(key)
+                cache.set(cache_key, entry, settings.TOKEN_CACHE_TIMEOUT)
+            _local.set(cache_key, entry)
+
+        issued_at, last_used_at, snapshot = entry
+        if tokens.is_expired(issued_at, last_used_at):
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        user = _user_from_snapshot(snapshot)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        tokens.touch(key)
+
+        # request.auth: an unsaved token carrying the key, no extra query
+        return (user, self.model(key=key, user_id=user.id))
+
+    def _load(self, key):
+        row = (
+            self.model.objects.filter(key=key)
+            .values_list('issued_at', 'last_used_at', *(f'user__{field}' for field in SNAPSHOT_FIELDS))
+            .first()
+        )
+        if row is None:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        return (row[0], row[1], row[2:])
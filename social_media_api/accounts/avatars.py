@@ -0,0 +1,282 @@
+"""
+Profile picture pipeline.
+
+- Upload: the profile view streams the multipart body to a temporary file
+  in chunks (AvatarUploadHandler) and stops reading a file as soon as it
+  passes AVATAR_MAX_UPLOAD_SIZE, so avatars never sit in memory.
+- Validation: only the image header is read (format and dimensions);
+  nothing is decoded on the request path.
+- Variants: after the upload commits, square thumbnails in JPEG and WebP
+  are rendered on a small background thread pool and their storage paths
+  stored in User.profile_picture_variants. `manage.py process_avatars`
+  renders anything missing (e.g. after a restart or a change to VARIANTS).
+
+Until its variants exist a user's avatar falls back to the original file.
+"""
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import connections, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Square thumbnail edge in pixels per variant name
+VARIANTS = {
+    'small': 64,
+    'medium': 256,
+}
+FORMATS = {
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+# Bump when VARIANTS or FORMATS change so process_avatars re-renders
+VARIANTS_VERSION = 1
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+
+class AvatarUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploaded files to a temporary file and skips any file larger
+    than AVATAR_MAX_UPLOAD_SIZE (`too_large` is then set).
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.too_large = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.AVATAR_MAX_UPLOAD_SIZE:
+            self.too_large = True
+            self.file.close()
+            raise SkipFile()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def validate_avatar(file):
+    """
+    Check format and dimensions from the image header only.
+    """
+
+    limit = settings.AVATAR_MAX_DIMENSION
+    try:
+        # Image.open() parses the header; pixel data is never loaded here
+        with Image.open(file) as image:
+            image_format = image.format
+            width, height = image.size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise serializers.ValidationError('Upload a valid image.')
+    finally:
+        file.seek(0)
+
+    if image_format not in ALLOWED_FORMATS:
+        raise serializers.ValidationError(
+            f"Unsupported image format; use one of {', '.join(sorted(ALLOWED_FORMATS))}."
+        )
+    if width > limit or height > limit:
+        raise serializers.ValidationError(f'Images may be at most {limit}x{limit} pixels.')
+
+
+def variant_paths(user):
+    """
+    {variant key: storage path} for the user's current picture, or {} when
+    the stored variants were rendered from an older picture.
+    """
+
+    variants = user.profile_picture_variants or {}
+    if not user.profile_picture or variants.get('source') != user.profile_picture.name:
+        return {}
+    return variants.get('files', {})
+
+
+def _variant_key(name, fmt):
+    return name if fmt == 'jpeg' else f'{name}_{fmt}'
+
+
+def _render(source, user_id):
+    """
+    Render every variant of an open image file and save it to storage.
+    Returns {variant key: storage path}.
+    """
+
+    stem = os.path.splitext(os.path.basename(source.name))[0]
+    files = {}
+
+    with Image.open(source) as image:
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale: far less work for big photos
+        image.draft('RGB', (max(VARIANTS.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # Flatten transparency onto white (JPEG has no alpha)
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+
+        for name, edge in VARIANTS.items():
+            thumbnail = ImageOps.fit(image, (edge, edge), Image.Resampling.LANCZOS)
+            for fmt, options in FORMATS.items():
+                buffer = io.BytesIO()
+                thumbnail.save(buffer, **options)
+                path = default_storage.save(
+                    f'profiles/variants/{user_id}/{stem}_{name}.{fmt}',
+                    ContentFile(buffer.getvalue())
+                )
+                files[_variant_key(name, fmt)] = path
+
+    return files
+
+
+def process(user_id):
+    """
+    Render the variants of a user's current picture and store their paths.
+    Files of previous variants are deleted. Returns True if rendered.
+    """
+
+    from .hydration import invalidate_users
+
+    user = User.objects.filter(pk=user_id).only(
+        'profile_picture', 'profile_picture_variants'
+    ).first()
+    if user is None:
+        return False
+
+    old = (user.profile_picture_variants or {}).get('files', {})
+    if not user.profile_picture:
+        # Cleared, possibly after this job was queued: nothing to render,
+        # only the previous picture's variants to drop
+        if user.profile_picture_variants and User.objects.filter(
+            Q(profile_picture='') | Q(profile_picture__isnull=True),
+            pk=user_id
+        ).update(profile_picture_variants={}):
+            for path in old.values():
+                default_storage.delete(path)
+            invalidate_users([user_id])
+        return False
+
+    with user.profile_picture.open('rb') as source:
+        files = _render(source, user_id)
+
+    # Only store the result if the picture did not change meanwhile
+    updated = User.objects.filter(
+        pk=user_id,
+        profile_picture=user.profile_picture.name
+    ).update(profile_picture_variants={
+        'source': user.profile_picture.name,
+        'version': VARIANTS_VERSION,
+        'files': files,
+    })
+
+    rendered = set(files.values())
+    if updated:
+        stale = set(old.values()) - rendered
+    else:
+        # Replaced or cleared while rendering; the next job handles it
+        stale = rendered
+    for path in stale:
+        default_storage.delete(path)
+
+    # QuerySet.update() bypasses the post_save signal
+    invalidate_users([user_id])
+    return bool(updated)
+
+
+def needs_processing(user):
+    variants = user.profile_picture_variants or {}
+    if not user.profile_picture:
+        return bool(variants)
+    return (
+        variants.get('source') != user.profile_picture.name
+        or variants.get('version') != VARIANTS_VERSION
+    )
+
+
+_executor = None
+_init_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.AVATAR_WORKERS,
+                    thread_name_prefix='avatars'
+                )
+    return _executor
+
+
+def _process_in_worker(user_id):
+    # Worker threads open their own connections; close them after each job
+    # so idle pool threads do not hold any
+    try:
+        process(user_id)
+    except Exception:
+        logger.exception('Rendering avatar variants for user %s failed', user_id)
+    finally:
+        connections.close_all()
+
+
+def schedule(user_id):
+    """
+    Render the user's variants once the current transaction commits:
+    on the worker pool, or inline when AVATAR_WORKERS is 0.
+    """
+
+    if settings.AVATAR_WORKERS:
+        transaction.on_commit(lambda: _get_executor().submit(_process_in_worker, user_id))
+    else:
+        transaction.on_commit(lambda: process(user_id))
+
+
+class AvatarField(serializers.Field):
+    """
+    Read-only avatar URL(s) from a user (source='*').
+
+    With `variant`, one URL: that variant, or the original picture until it
+    is rendered. Without, {variant key: URL} for every rendered variant.
+    """
+
+    def __init__(self, variant=None, **kwargs):
+        self.variant = variant
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def _url(self, path):
+        url = default_storage.url(path)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def to_representation(self, user):
+        paths = variant_paths(user)
+        if self.variant is None:
+            return {key: self._url(path) for key, path in paths.items()}
+
+        if self.variant in paths:
+            return self._url(paths[self.variant])
+        if user.profile_picture:
+            return self._url(user.profile_picture.name)
+        return None
@@ -0,0 +1,187 @@
+"""
+Follow-graph adjacency cache.
+
+Each user's followee ids and follower ids are kept as a sorted array of
+64-bit ints, in two layers:
+
+- process memory, for a few seconds (FOLLOW_GRAPH_LOCAL_TTL), so hot users
+  cost nothing per request
+- the shared Django cache, as raw array bytes (8 bytes per id)
+
+Both are filled from a single-column read of the through table on a miss.
+services.follow/unfollow invalidate only the two lists an edge touches,
+after the transaction commits, by bumping a per-list version. A shared
+entry records the version read *before* its database read, so a reader
+that loaded the old list just before the commit cannot put it back as
+current (the stale-set race); the version and the list are fetched in one
+get_many.
+"""
+
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from social_media_api.localcache import LocalCache
+from social_media_api.replicas import primary
+
+User = get_user_model()
+Follow = User.following.through
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+
+_COLUMNS = {
+    # direction: (column filtered on, column returned)
+    FOLLOWING: ('from_user_id', 'to_user_id'),
+    FOLLOWERS: ('to_user_id', 'from_user_id'),
+}
+
+_local = LocalCache(
+    max_entries=lambda: settings.FOLLOW_GRAPH_LOCAL_MAX_ENTRIES,
+    ttl=lambda: settings.FOLLOW_GRAPH_LOCAL_TTL
+)
+
+
+class IdSet:
+    """
+    Read-only set of user ids backed by a sorted array.
+    Membership is a binary search; iteration yields ids in ascending order.
+    """
+
+    __slots__ = ('ids',)
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __contains__(self, user_id):
+        index = bisect_left(self.ids, user_id)
+        return index < len(self.ids) and self.ids[index] == user_id
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return f'IdSet({list(self.ids)!r})'
+
+
+def _cache_key(direction, user_id):
+    return f'follow-graph:{direction}:{user_id}'
+
+
+def _version_key(cache_key):
+    return f'{cache_key}:version'
+
+
+def _current_version(cache_key, found):
+    version = found.get(_version_key(cache_key))
+    if version is None:
+        # A fresh timestamp never matches an entry written under a version
+        # that was evicted
+        cache.add(_version_key(cache_key), int(time.time() * 1000), None)
+        version = cache.get(_version_key(cache_key))
+    return version
+
+
+def _load(direction, user_id):
+    where, column = _COLUMNS[direction]
+    # The result is cached: read the primary, never a lagging replica
+    with primary():
+        return array('q', sorted(
+            Follow.objects.filter(**{where: user_id}).values_list(column, flat=True)
+        ))
+
+
+def _get(direction, user_id, local=True):
+    key = _cache_key(direction, user_id)
+
+    ids = _local.get(key) if local else None
+    if ids is not None:
+        return IdSet(ids)
+
+    found = cache.get_many([key, _version_key(key)])
+    version = _current_version(key, found)
+    entry = found.get(key)
+    if entry is not None and entry[0] == version:
+        ids = array('q')
+        ids.frombytes(entry[1])
+    else:
+        ids = _load(direction, user_id)
+        # Very large lists (celebrity followers) are read from the database
+        # every time rather than shipped through the cache
+        if len(ids) > settings.FOLLOW_GRAPH_MAX_CACHED_IDS:
+            return IdSet(ids)
+        cache.set(key, (version, ids.tobytes()), settings.FOLLOW_GRAPH_CACHE_TIMEOUT)
+
+    _local.set(key, ids)
+    return IdSet(ids)
+
+
+def following_ids(user_id, local=True):
+    """
+    Ids of the users `user_id` follows.
+    Pass local=False on write paths that must not see a list up to
+    FOLLOW_GRAPH_LOCAL_TTL seconds old.
+    """
+
+    return _get(FOLLOWING, user_id, local)
+
+
+def follower_ids(user_id, local=True):
+    """
+    Ids of the users following `user_id` (see following_ids for `local`).
+    """
+
+    return _get(FOLLOWERS, user_id, local)
+
+
+def is_following(user_id, target_id):
+    """
+    Whether `user_id` follows `target_id`.
+    """
+
+    return target_id in following_ids(user_id)
+
+
+def _forget(keys):
+    for key in keys:
+        try:
+            cache.incr(_version_key(key))
+        except ValueError:
+            # No version yet: no entry can claim the new one either
+            cache.set(_version_key(key), int(time.time() * 1000), None)
+    _local.delete_many(keys)
+
+
+def invalidate_edge(user_id, target_id):
+    """
+    Drop the two lists changed by `user_id` (un)following `target_id`,
+    once the current transaction commits.
+    """
+
+    invalidate_edges(user_id, [target_id])
+
+
+def invalidate_edges(user_id, target_ids):
+    """
+    invalidate_edge for one user (un)following several targets.
+    """
+
+    keys = [_cache_key(FOLLOWING, user_id)]
+    keys += [_cache_key(FOLLOWERS, target_id) for target_id in target_ids]
+    transaction.on_commit(lambda: _forget(keys))
+
+
+def clear_local():
+    """
+    Empty this process's layer (the shared cache is left alone).
+    """
+
+    _local.clear()
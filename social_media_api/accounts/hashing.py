@@ -0,0 +1,76 @@
+"""
+Password hashing off the request path.
+
+PBKDF2 takes hundreds of milliseconds of CPU. The async login/register
+views await it on a small, bounded thread pool instead of running it on
+the event loop (hashlib releases the GIL while hashing), so a burst of
+logins queues here rather than stalling every other request.
+
+Only pure hashing runs on the pool: no database access happens in these
+threads, so they never hold connections of their own.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password, verify_password
+
+
+class HashingOverloaded(Exception):
+    """
+    More hashing jobs are waiting than PASSWORD_HASHING_MAX_PENDING allows.
+    """
+
+
+_executor = None
+_slots = None
+_init_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _slots
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                workers = settings.PASSWORD_HASHING_WORKERS or os.cpu_count() or 2
+                _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASHING_MAX_PENDING)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+    return _executor, _slots
+
+
+async def run(func, *args):
+    """
+    Run `func(*args)` on the hashing pool and await the result.
+    Raises HashingOverloaded instead of queueing without bound.
+    """
+
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise HashingOverloaded()
+
+    future = executor.submit(func, *args)
+    future.add_done_callback(lambda _: slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def ahash_password(password):
+    return await run(make_password, password)
+
+
+async def acheck_password(password, encoded):
+    """
+    Returns (matches, new_encoded). new_encoded is a re-hash to store when
+    the stored hash uses outdated parameters, otherwise None.
+    """
+
+    # encoded=None (unknown user) still costs one hash, like ModelBackend,
+    # so response time does not reveal whether the username exists
+    if encoded is None:
+        encoded = UNUSABLE_PASSWORD_PREFIX
+    matches, must_update = await run(verify_password, password, encoded)
+    if matches and must_update:
+        return True, await ahash_password(password)
+    return matches, None
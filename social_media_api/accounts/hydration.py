@@ -0,0 +1,106 @@
+"""
+Batched user hydration.
+
+Posts, comments and notifications embed a small "user card" (the
+SlimUserSerializer fields) for their author/actor. Instead of joining the
+users table into every list query, a page collects its user ids and loads
+all cards at once: one cache get_many, plus one query for the misses.
+
+Cards are cached per user id under CARD_VERSION (bump it when the card
+format changes) and dropped when the user is saved (accounts/signals.py).
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import models, transaction
+from rest_framework import serializers
+
+from social_media_api.replicas import primary
+from .serializers import SlimUserSerializer
+
+User = get_user_model()
+
+CARD_VERSION = 2
+
+
+def _card_key(user_id):
+    return f'user-card:{CARD_VERSION}:{user_id}'
+
+
+def hydrate_users(user_ids):
+    """
+    Cards for the given user ids as {id: card}. Unknown ids are omitted.
+    """
+
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+
+    cached = cache.get_many([_card_key(user_id) for user_id in user_ids])
+    cards = {card['id']: card for card in cached.values()}
+
+    missing = user_ids - cards.keys()
+    if missing:
+        # Cached cards are read from the primary, never a lagging replica
+        with primary():
+            users = User.objects.filter(id__in=missing).only(*SlimUserSerializer.columns)
+            loaded = {card['id']: card for card in SlimUserSerializer(users, many=True).data}
+        cache.set_many(
+            {_card_key(user_id): card for user_id, card in loaded.items()},
+            settings.USER_CARD_CACHE_TIMEOUT
+        )
+        cards.update(loaded)
+
+    return cards
+
+
+def invalidate_users(user_ids):
+    """
+    Drop cached cards once the current transaction commits.
+    """
+
+    keys = [_card_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class UserCardField(serializers.Field):
+    """
+    Read-only embedded user card; `source` must be a user id attribute
+    (e.g. 'author_id'). With `attribute`, only that card value is output
+    (e.g. the username). List serializers using UserCardListSerializer
+    hydrate the whole page first; a single object hydrates on its own.
+    """
+
+    def __init__(self, attribute=None, **kwargs):
+        self.attribute = attribute
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, user_id):
+        cards = self.context.get('user_cards', {})
+        if user_id not in cards:
+            cards = hydrate_users([user_id])
+
+        card = cards.get(user_id)
+        if card is None:
+            return None
+        return card[self.attribute] if self.attribute else dict(card)
+
+
+class UserCardListSerializer(serializers.ListSerializer):
+    """
+    Loads the cards of every UserCardField in the page in one batch.
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+
+        sources = [
+            field.source for field in self.child.fields.values()
+            if isinstance(field, UserCardField)
+        ]
+        user_ids = {getattr(item, source) for item in items for source in sources}
+        self.context['user_cards'] = hydrate_users(user_ids - {None})
+
+        return super().to_representation(items)
@@ -0,0 +1,93 @@
+"""
+Concurrency limits for the password endpoints.
+
+Counts in-flight login/register requests per client IP and per username in
+the shared cache, so one client (or one targeted account) cannot occupy the
+whole hashing pool. Slots expire after SLOT_TIMEOUT seconds in case a
+process dies while holding one.
+"""
+
+import hashlib
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+SLOT_TIMEOUT = 60
+
+
+class LimitExceeded(Exception):
+    pass
+
+
+def client_ip(request):
+    """
+    The client's address. Behind TRUSTED_PROXY_COUNT proxies that each
+    append to TRUSTED_PROXY_HEADER (e.g. X-Forwarded-For), it is the entry
+    that many places from the right; entries further left are
+    client-controlled. Otherwise REMOTE_ADDR.
+    """
+
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    hops = settings.TRUSTED_PROXY_COUNT
+    if not settings.TRUSTED_PROXY_HEADER or hops <= 0:
+        return remote_addr
+
+    header = 'HTTP_' + settings.TRUSTED_PROXY_HEADER.upper().replace('-', '_')
+    addresses = [
+        address.strip() for address in request.META.get(header, '').split(',')
+        if address.strip()
+    ]
+    if len(addresses) < hops:
+        # Did not come through every proxy
+        return remote_addr
+    return addresses[-hops]
+
+
+def _digest(value):
+    # Usernames are user input; keep cache keys short and safe
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+async def _acquire(key, limit):
+    await cache.aadd(key, 0, SLOT_TIMEOUT)
+    try:
+        count = await cache.aincr(key)
+    except ValueError:
+        # Expired between add and incr
+        await cache.aset(key, 1, SLOT_TIMEOUT)
+        count = 1
+    if count > limit:
+        await _release(key)
+        return False
+    return True
+
+
+async def _release(key):
+    try:
+        await cache.adecr(key)
+    except ValueError:
+        pass
+
+
+@asynccontextmanager
+async def concurrency_limit(request, username):
+    """
+    Hold one slot for the client IP and one for the username, or raise
+    LimitExceeded.
+    """
+
+    slots = [
+        (f'auth-limit:ip:{client_ip(request)}', settings.AUTH_MAX_CONCURRENT_PER_IP),
+        (f'auth-limit:user:{_digest(username.lower())}', settings.AUTH_MAX_CONCURRENT_PER_USERNAME),
+    ]
+    held = []
+    try:
+        for key, limit in slots:
+            if not await _acquire(key, limit):
+                raise LimitExceeded()
+            held.append(key)
+        yield
+    finally:
+        for key in held:
+            await _release(key)
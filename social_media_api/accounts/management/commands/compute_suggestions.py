@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from accounts.suggestions import compute_for, iter_user_batches, refresh_queued
+
+
+class Command(BaseCommand):
+    """
+    Batch job for follow suggestions (see accounts/suggestions.py).
+    By default recomputes the users queued by follow/unfollow; --all
+    recomputes everyone who follows at least one account.
+    """
+
+    help = "Compute friend-of-friend follow suggestions in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every user, not only queued ones.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Users computed per batch (default: 500).'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users = rows = 0
+
+        if options['all']:
+            for batch in iter_user_batches(batch_size):
+                rows += compute_for(batch)
+                users += len(batch)
+        else:
+            while True:
+                computed, written = refresh_queued(batch_size)
+                if not computed:
+                    break
+                users += computed
+                rows += written
+
+        self.stdout.write(self.style.SUCCESS(f"Computed {rows} suggestion(s) for {users} user(s)."))
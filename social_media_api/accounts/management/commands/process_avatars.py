@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from accounts.avatars import needs_processing, process
+
+
+class Command(BaseCommand):
+    """
+    Catch-up job for profile picture thumbnails (see accounts/avatars.py).
+    Renders variants that are missing or outdated, e.g. for pictures
+    uploaded before the pipeline existed, jobs lost in a restart, or after
+    VARIANTS changed. --force re-renders every picture.
+    """
+
+    help = "Render missing or outdated profile picture thumbnails."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render every picture, not only outdated ones.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Users read from the database per query (default: 500).'
+        )
+
+    def handle(self, *args, **options):
+        users = (
+            get_user_model().objects
+            .filter(Q(profile_picture__gt='') | ~Q(profile_picture_variants={}))
+            .only('profile_picture', 'profile_picture_variants')
+            .order_by('pk')
+        )
+
+        rendered = 0
+        for user in users.iterator(chunk_size=options['chunk_size']):
+            if options['force'] or needs_processing(user):
+                rendered += process(user.pk)
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered thumbnails for {rendered} user(s)."))
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import AuthToken
+from accounts.tokens import expired_tokens, sync_last_used
+
+
+class Command(BaseCommand):
+    """
+    Cleanup job for the API token table.
+    Deletes expired tokens in small batches so the table and its indexes
+    stay small and each DELETE holds its locks only briefly. Uses not yet
+    written to the database (see accounts/tokens.py) are saved first, so
+    an active token is never purged.
+    """
+
+    help = "Delete expired API tokens, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per statement (default: 1000).'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between batches to limit load.'
+        )
+
+    def handle(self, *args, **options):
+        expired = expired_tokens()
+        total = 0
+
+        while True:
+            keys = list(expired.values_list('key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+
+            # Still in use: the next batch re-checks them against max age
+            keys = set(keys) - set(sync_last_used(keys))
+
+            # QuerySet.delete() sends post_delete, clearing cached lookups
+            deleted, _ = AuthToken.objects.filter(key__in=keys).delete()
+            total += deleted
+
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired token(s)."))
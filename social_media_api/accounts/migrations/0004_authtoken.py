@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_tokens(apps, schema_editor):
+    # Existing DRF tokens keep working; they count as used now so they do
+    # not expire as idle right after the deploy
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('accounts', 'AuthToken')
+    now = timezone.now()
+
+    AuthToken.objects.bulk_create(
+        [
+            AuthToken(key=key, user_id=user_id, issued_at=now, last_used_at=now)
+            for key, user_id in Token.objects.values_list('key', 'user_id').iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_follow_counters'),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('device', models.CharField(blank=True, max_length=100)),
+                ('issued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auth_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'device'], name='authtoken_user_device_idx'), models.Index(fields=['last_used_at'], name='authtoken_last_used_idx'), models.Index(fields=['issued_at'], name='authtoken_issued_idx')],
+            },
+        ),
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+    ]
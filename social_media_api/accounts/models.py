@@ -1,5 +1,10 @@
+import binascii
+import os
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -14,6 +19,8 @@ class User(AbstractUser):
         blank=True,
         null=True
     )
+    # Rendered thumbnails of profile_picture, see accounts/avatars.py
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     # Users THIS user follows
     following = models.ManyToManyField(
@@ -23,5 +30,98 @@ class User(AbstractUser):
         blank=True
     )
 
+    # Denormalized counters for the follow graph, kept in sync by
+    # accounts.services.follow / unfollow
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return self.username
+
+
+class AuthToken(models.Model):
+    """
+    API token for one device of a user.
+    Replaced on every login from that device and expires after
+    AUTH_TOKEN_MAX_AGE (since issue) or AUTH_TOKEN_IDLE_TIMEOUT (since
+    last use); see accounts/tokens.py.
+    """
+
+    key = models.CharField(max_length=40, primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='auth_tokens'
+    )
+    device = models.CharField(max_length=100, blank=True)
+    issued_at = models.DateTimeField(default=timezone.now)
+    # Updated at most every AUTH_TOKEN_TOUCH_INTERVAL seconds
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'device'], name='authtoken_user_device_idx'),
+            # Expiry scans for purge_tokens
+            models.Index(fields=['last_used_at'], name='authtoken_last_used_idx'),
+            models.Index(fields=['issued_at'], name='authtoken_issued_idx'),
+        ]
+
+    @staticmethod
+    def generate_key():
+        return binascii.hexlify(os.urandom(20)).decode()
+
+    def __str__(self):
+        return f"{self.user_id} ({self.device or 'default'})"
+
+
+class FollowSuggestion(models.Model):
+    """
+    A precomputed "people you may know" entry: `candidate` is followed by
+    `score` of the users `user` follows. Rewritten per user by
+    accounts/suggestions.py; read one page at a time.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions'
+    )
+    candidate = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'candidate'],
+                name='unique_follow_suggestion'
+            ),
+        ]
+        indexes = [
+            # Keyset pages: WHERE user_id = ? ORDER BY score DESC, id (rank order)
+            models.Index(fields=['user', '-score', 'id'], name='suggestion_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.candidate_id} ({self.score})"
+
+
+class SuggestionRefresh(models.Model):
+    """
+    Users whose follow graph changed since their suggestions were computed.
+    Queued by accounts.services and drained by `compute_suggestions`.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+'
+    )
+    requested_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Refresh suggestions for {self.user_id}"
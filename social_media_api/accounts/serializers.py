@@ -1,6 +1,11 @@
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
-from rest_framework.authtoken.models import Token
+
+from social_media_api.mixins import EagerLoadingMixin
+
+from .avatars import AvatarField, schedule, validate_avatar
+from .models import FollowSuggestion
 
 """
 Serializers convert:
@@ -14,7 +19,7 @@ They are NOT controllers — just translators.
 class RegisterSerializer(serializers.ModelSerializer):
     """
     Handles user registration.
-    Creates a user and immediately generates an auth token.
+    The view issues the auth token (see accounts/tokens.py).
     """
 
     # Password should never be returned in responses
@@ -27,59 +32,52 @@ class RegisterSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """
         Create a new user using Django's built-in user manager.
+        The async RegisterView passes `password_hash`, computed on the
+        hashing pool (see accounts/hashing.py), so no hashing happens here;
+        other callers get the password hashed in place.
         """
 
-        user = get_user_model().objects.create_user(
-            username=validated_data['username'],
-            email=validated_data.get('email'),
-            password=validated_data['password'],
-            bio=validated_data.get('bio', '')
+        password_hash = validated_data.pop('password_hash', None)
+        if password_hash is None:
+            password_hash = make_password(validated_data['password'])
+
+        # What create_user() does, but with the hash set before the one INSERT
+        User = get_user_model()
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data.get('email')),
+            bio=validated_data.get('bio', ''),
+            password=password_hash
         )
-
-        # Create a token for API authentication
-        Token.objects.create(user=user)
+        user.save()
 
         return user
 
 
 class LoginSerializer(serializers.Serializer):
     """
-    Validates login credentials.
+    Validates the shape of login credentials.
+    The password itself is checked by LoginView on the hashing pool.
     """
 
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
 
-    def validate(self, data):
-        """
-        Authenticate the user using Django's auth system.
-        """
-
-        user = authenticate(
-            username=data['username'],
-            password=data['password']
-        )
-
-        if not user:
-            raise serializers.ValidationError("Invalid username or password")
-
-        return user
-
 
 class UserProfileSerializer(serializers.ModelSerializer):
     """
     Serializer for viewing and updating user profiles.
+    The picture's header is validated here; thumbnails are rendered after
+    the update commits (see accounts/avatars.py).
     """
 
-    # Computed fields (not stored in the database)
-    followers_count = serializers.IntegerField(
-        source='followers.count',
-        read_only=True
-    )
-    following_count = serializers.IntegerField(
-        source='following.count',
-        read_only=True
+    # FileField, not ImageField: ImageField reads the whole image to verify it
+    profile_picture = serializers.FileField(
+        required=False,
+        allow_null=True,
+        validators=[validate_avatar]
     )
+    profile_picture_variants = AvatarField()
 
     class Meta:
         model = get_user_model()
@@ -88,6 +86,58 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'email',
             'bio',
             'profile_picture',
+            'profile_picture_variants',
             'followers_count',
             'following_count'
         ]
+        # Denormalized counters, maintained by accounts.services
+        read_only_fields = ['followers_count', 'following_count']
+
+    def update(self, instance, validated_data):
+        user = super().update(instance, validated_data)
+        if 'profile_picture' in validated_data:
+            schedule(user.pk)
+        return user
+
+
+class SlimUserSerializer(serializers.ModelSerializer):
+    """
+    Minimal public user representation for lists of users.
+    `profile_picture` is the small thumbnail, not the original upload.
+    """
+
+    # Columns to load for this serializer (e.g. with .only())
+    columns = ['id', 'username', 'profile_picture', 'profile_picture_variants']
+
+    profile_picture = AvatarField(variant='small_webp')
+
+    class Meta:
+        model = get_user_model()
+        fields = ['id', 'username', 'profile_picture']
+        read_only_fields = fields
+
+
+class BulkFollowSerializer(serializers.Serializer):
+    """
+    Validates a bulk follow / unfollow request.
+    """
+
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=100
+    )
+
+
+class FollowSuggestionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """
+    A suggested account and how many of the people you follow follow it.
+    """
+
+    select_related_fields = ('candidate',)
+
+    user = SlimUserSerializer(source='candidate', read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ['user', 'score']
@@ -0,0 +1,193 @@
+"""
+Follow graph write operations.
+
+Every change to User.following goes through these helpers so that the
+denormalized follower/following counters and the materialized feeds are
+updated in the same transaction as the relationship itself, the
+"started following you" notification is queued with it, the cached
+adjacency lists (accounts/graph.py) are invalidated on commit, and the
+follower's suggestions are queued for recomputation.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+
+from notifications.dispatch import enqueue, notify
+from notifications.models import NotificationEvent
+from posts.feed import backfill_feed, backfill_feeds, prune_feed, prune_feeds
+
+from . import graph, suggestions
+from .models import FollowSuggestion
+
+User = get_user_model()
+Follow = User.following.through
+
+FOLLOW_VERB = 'started following you'
+
+
+def _lock(user):
+    # Serializes every follow change by the same follower (single and bulk),
+    # so a concurrent request cannot insert an edge between another's read
+    # of the existing edges and its counter updates
+    User.objects.select_for_update().filter(pk=user.pk).values_list('pk').first()
+
+
+def follow(user, target):
+    """
+    Make `user` follow `target`.
+    Returns True if a new relationship was created, False if it existed.
+    """
+
+    with transaction.atomic():
+        _lock(user)
+        _, created = Follow.objects.get_or_create(
+            from_user_id=user.id,
+            to_user_id=target.id
+        )
+
+        if created:
+            User.objects.filter(pk=user.pk).update(
+                following_count=F('following_count') + 1
+            )
+            User.objects.filter(pk=target.pk).update(
+                followers_count=F('followers_count') + 1
+            )
+            backfill_feed(user, target)
+            graph.invalidate_edge(user.id, target.id)
+            _suggestions_changed(user, [target.id])
+
+            # 🔔 Notify the followed user (only for new follows)
+            notify(
+                recipient_id=target.id,
+                actor_id=user.id,
+                verb=FOLLOW_VERB,
+                target=target
+            )
+
+    return created
+
+
+def unfollow(user, target):
+    """
+    Make `user` stop following `target`.
+    Returns True if a relationship was removed.
+    """
+
+    with transaction.atomic():
+        _lock(user)
+        deleted, _ = Follow.objects.filter(
+            from_user_id=user.id,
+            to_user_id=target.id
+        ).delete()
+
+        if deleted:
+            User.objects.filter(pk=user.pk).update(
+                following_count=F('following_count') - 1
+            )
+            User.objects.filter(pk=target.pk).update(
+                followers_count=F('followers_count') - 1
+            )
+            prune_feed(user, target)
+            graph.invalidate_edge(user.id, target.id)
+            _suggestions_changed(user)
+
+    return bool(deleted)
+
+
+def _suggestions_changed(user, followed_ids=()):
+    # Newly followed accounts stop being suggestions right away; the rest
+    # of the list is recomputed by the next `compute_suggestions` run
+    if followed_ids:
+        FollowSuggestion.objects.filter(
+            user_id=user.id,
+            candidate_id__in=followed_ids
+        ).delete()
+    suggestions.request_refresh([user.id])
+
+
+def bulk_follow(user, target_ids):
+    """
+    Make `user` follow every user in `target_ids` with one INSERT.
+    Unknown ids, the user themself and existing follows are skipped.
+    Returns the ids that were newly followed.
+    """
+
+    target_ids = set(target_ids) - {user.id}
+
+    with transaction.atomic():
+        _lock(user)
+
+        existing = set(
+            User.objects.filter(id__in=target_ids).values_list('id', flat=True)
+        )
+        already = set(
+            Follow.objects.filter(from_user_id=user.id, to_user_id__in=existing)
+            .values_list('to_user_id', flat=True)
+        )
+        new_ids = sorted(existing - already)
+        if not new_ids:
+            return []
+
+        Follow.objects.bulk_create(
+            [Follow(from_user_id=user.id, to_user_id=target_id) for target_id in new_ids],
+            ignore_conflicts=True
+        )
+        User.objects.filter(pk=user.pk).update(
+            following_count=F('following_count') + len(new_ids)
+        )
+        User.objects.filter(pk__in=new_ids).update(
+            followers_count=F('followers_count') + 1
+        )
+        backfill_feeds(user, new_ids)
+        graph.invalidate_edges(user.id, new_ids)
+        _suggestions_changed(user, new_ids)
+
+        # 🔔 One queued event per newly followed user, in one INSERT
+        content_type = ContentType.objects.get_for_model(User)
+        enqueue([
+            NotificationEvent(
+                recipient_id=target_id,
+                actor_id=user.id,
+                verb=FOLLOW_VERB,
+                content_type=content_type,
+                object_id=target_id
+            )
+            for target_id in new_ids
+        ])
+
+    return new_ids
+
+
+def bulk_unfollow(user, target_ids):
+    """
+    Make `user` stop following every user in `target_ids` with one DELETE.
+    Returns the ids that were actually unfollowed.
+    """
+
+    with transaction.atomic():
+        _lock(user)
+
+        removed_ids = sorted(
+            Follow.objects.filter(from_user_id=user.id, to_user_id__in=set(target_ids))
+            .values_list('to_user_id', flat=True)
+        )
+        if not removed_ids:
+            return []
+
+        Follow.objects.filter(
+            from_user_id=user.id,
+            to_user_id__in=removed_ids
+        ).delete()
+        User.objects.filter(pk=user.pk).update(
+            following_count=F('following_count') - len(removed_ids)
+        )
+        User.objects.filter(pk__in=removed_ids).update(
+            followers_count=F('followers_count') - 1
+        )
+        prune_feeds(user, removed_ids)
+        graph.invalidate_edges(user.id, removed_ids)
+        _suggestions_changed(user)
+
+    return removed_ids
@@ -0,0 +1,50 @@
+"""
+Keep the token lookup cache (accounts/authentication.py) and the user
+card cache (accounts/hydration.py) in sync.
+Bulk QuerySet.update()/delete() calls bypass these signals; call
+invalidate_tokens() yourself after those.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import SNAPSHOT_FIELDS, invalidate_tokens
+from .hydration import invalidate_users
+from .models import AuthToken
+from .serializers import SlimUserSerializer
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=AuthToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    # Logout, token rotation, and tokens cascaded from a deleted user
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, update_fields, **kwargs):
+    # The cached snapshot (username, is_active, ...) may have changed
+    if created:
+        return
+    # e.g. update_last_login() on every login
+    if update_fields and not set(update_fields) & set(SNAPSHOT_FIELDS):
+        return
+    invalidate_tokens(
+        AuthToken.objects.filter(user_id=instance.pk).values_list('key', flat=True)
+    )
+
+
+@receiver(post_save, sender=User)
+def forget_user_card(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields and not set(update_fields) & set(SlimUserSerializer.columns):
+        return
+    invalidate_users([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user_card(sender, instance, **kwargs):
+    invalidate_users([instance.pk])
@@ -0,0 +1,216 @@
+"""
+Friend-of-friend follow suggestions.
+
+A user's candidates are the accounts followed by the people they follow,
+scored by how many of those people follow them (the 2-hop path count),
+excluding themself and accounts they already follow.
+
+Scores are computed offline by `manage.py compute_suggestions`, a batch of
+users at a time: the follow edges around the batch are loaded into NumPy
+arrays as a CSR adjacency, both hops are expanded with vectorized
+gathers, and path counts come from one np.unique over (user, candidate)
+keys. The top SUGGESTIONS_PER_USER per user replace that user's rows in
+FollowSuggestion, which the API reads one indexed page at a time.
+
+Follows and unfollows queue the follower in SuggestionRefresh so the next
+run recomputes just them. Changes further away (someone you follow
+follows a new account) are picked up by periodic `--all` runs.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+
+from .models import FollowSuggestion, SuggestionRefresh
+
+User = get_user_model()
+Follow = User.following.through
+
+# Ids per IN (...) clause when loading edges
+CHUNK_SIZE = 5000
+
+
+def request_refresh(user_ids):
+    """
+    Queue users for recomputation (inside the caller's transaction).
+    """
+
+    # An existing request gets a new timestamp so a run that is computing
+    # the user right now does not drop it
+    SuggestionRefresh.objects.bulk_create(
+        [SuggestionRefresh(user_id=user_id) for user_id in user_ids],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['requested_at']
+    )
+
+
+def _edges_from(user_ids, max_following=None):
+    """
+    (from, to) follow edges starting at `user_ids` as an (n, 2) int64 array.
+    """
+
+    user_ids = list(user_ids)
+    chunks = []
+    for start in range(0, len(user_ids), CHUNK_SIZE):
+        edges = Follow.objects.filter(from_user_id__in=user_ids[start:start + CHUNK_SIZE])
+        if max_following is not None:
+            edges = edges.filter(from_user__following_count__lte=max_following)
+        rows = list(edges.values_list('from_user_id', 'to_user_id'))
+        if rows:
+            chunks.append(np.array(rows, dtype=np.int64))
+    return np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+
+
+def _expand(rows, indptr, indices):
+    """
+    Neighbours of every node in `rows` (CSR), flattened.
+    Returns (position in `rows`, neighbour) arrays.
+    """
+
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+
+    positions = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return positions, indices[np.repeat(starts, lengths) + offsets]
+
+
+def two_hop_scores(owners, edges, limit, max_following):
+    """
+    Top `limit` 2-hop candidates for each user in `owners`.
+
+    `edges` must contain every edge leaving an owner and every edge leaving
+    the accounts they follow (hubs may be left out). Middle-hop accounts
+    following more than `max_following` users are ignored.
+
+    Returns (owner_ids, candidate_ids, scores) arrays, best first per owner.
+    """
+
+    empty = np.empty(0, dtype=np.int64)
+    if not len(owners) or not len(edges):
+        return empty, empty, empty
+
+    # Dense node numbering: CSR needs 0..n-1 indices
+    nodes, inverse = np.unique(np.concatenate([edges.ravel(), owners]), return_inverse=True)
+    n = len(nodes)
+    src = inverse[0:2 * len(edges):2]
+    dst = inverse[1:2 * len(edges):2]
+    own = inverse[2 * len(edges):]
+
+    order = np.argsort(src, kind='stable')
+    degree = np.bincount(src, minlength=n)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(degree, out=indptr[1:])
+    indices = dst[order]
+
+    # Hop 1: the accounts each owner follows
+    pos1, followee = _expand(own, indptr, indices)
+    owner1 = own[pos1]
+
+    # Hop 2: the accounts those follow, skipping hubs
+    keep = degree[followee] <= max_following
+    pos2, candidate = _expand(followee[keep], indptr, indices)
+    owner2 = owner1[keep][pos2]
+
+    keys = owner2 * n + candidate
+    known = owner1 * n + followee
+    valid = (candidate != owner2) & ~np.isin(keys, known)
+    keys, scores = np.unique(keys[valid], return_counts=True)
+
+    owner, candidate = keys // n, keys % n
+
+    # Best first within each owner, then keep the first `limit`
+    order = np.lexsort((candidate, -scores, owner))
+    owner, candidate, scores = owner[order], candidate[order], scores[order]
+    index = np.arange(len(owner))
+    group_start = np.r_[True, owner[1:] != owner[:-1]]
+    rank = index - np.maximum.accumulate(np.where(group_start, index, 0))
+    top = rank < limit
+
+    return nodes[owner[top]], nodes[candidate[top]], scores[top]
+
+
+def compute_for(user_ids):
+    """
+    Recompute and store suggestions for a batch of users.
+    Returns the number of suggestion rows written.
+    """
+
+    owners = np.unique(np.fromiter(user_ids, dtype=np.int64))
+    if not len(owners):
+        return 0
+
+    # Hop 1 edges in full (needed to exclude accounts already followed),
+    # then the edges of followed accounts that are not hubs
+    first = _edges_from(owners.tolist())
+    middle = np.setdiff1d(first[:, 1], owners)
+    second = _edges_from(middle.tolist(), settings.SUGGESTIONS_MAX_HUB_FOLLOWING)
+    edges = np.concatenate([first, second])
+
+    owner_ids, candidate_ids, scores = two_hop_scores(
+        owners,
+        edges,
+        settings.SUGGESTIONS_PER_USER,
+        settings.SUGGESTIONS_MAX_HUB_FOLLOWING
+    )
+
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=owners.tolist()).delete()
+        FollowSuggestion.objects.bulk_create(
+            [
+                FollowSuggestion(user_id=owner, candidate_id=candidate, score=score)
+                for owner, candidate, score in zip(
+                    owner_ids.tolist(), candidate_ids.tolist(), scores.tolist()
+                )
+            ],
+            batch_size=1000
+        )
+
+    return len(owner_ids)
+
+
+def refresh_queued(batch_size):
+    """
+    Recompute one batch of queued users. Returns (users, rows written).
+    """
+
+    queued = list(
+        SuggestionRefresh.objects.order_by('requested_at')
+        .values_list('user_id', flat=True)[:batch_size]
+    )
+    if not queued:
+        return 0, 0
+
+    # Requests queued while computing stay queued for the next run
+    cutoff = SuggestionRefresh.objects.filter(user_id__in=queued).aggregate(
+        latest=Max('requested_at')
+    )['latest']
+    written = compute_for(queued)
+    SuggestionRefresh.objects.filter(
+        user_id__in=queued,
+        requested_at__lte=cutoff
+    ).delete()
+
+    return len(queued), written
+
+
+def iter_user_batches(batch_size):
+    """
+    Ids of every user who follows someone, in pk-ordered batches.
+    """
+
+    last_id = 0
+    while True:
+        batch = list(
+            User.objects.filter(pk__gt=last_id, following_count__gt=0)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
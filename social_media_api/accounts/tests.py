@@ -1,3 +1,659 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from notifications.models import NotificationEvent
+from social_media_api.testing import QueryCountGuardMixin
+
+from . import authentication, avatars, graph, hydration, limits, services, suggestions, tokens
+from .models import AuthToken, FollowSuggestion, SuggestionRefresh
+from .serializers import RegisterSerializer
+
+User = get_user_model()
+
+
+class FollowListQueryCountTests(QueryCountGuardMixin, TestCase):
+    """
+    Follower / following lists must run the same number of queries for any
+    page size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('user')
+        others = [User.objects.create_user(f'other{index}') for index in range(12)]
+
+        services.bulk_follow(cls.user, [other.id for other in others])
+        for other in others:
+            services.follow(other, cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_followers(self):
+        self.assertQueryCountConstant(self.client, f'/api/accounts/{self.user.id}/followers/')
+
+    def test_following(self):
+        self.assertQueryCountConstant(self.client, f'/api/accounts/{self.user.id}/following/')
+
+
+class HydrationTests(TestCase):
+    """
+    Cards come from one get_many plus one query for the misses, and are
+    dropped when the user changes or is deleted.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(f'user{index}') for index in range(3)]
+        self.ids = [user.id for user in self.users]
+
+    def test_misses_load_in_one_query(self):
+        hydration.hydrate_users(self.ids[:1])
+
+        with self.assertNumQueries(1):
+            cards = hydration.hydrate_users(self.ids + [999999])
+        self.assertEqual({user_id: card['username'] for user_id, card in cards.items()}, {
+            user.id: user.username for user in self.users
+        })
+
+        with self.assertNumQueries(0):
+            hydration.hydrate_users(self.ids)
+
+    def test_changes_invalidate(self):
+        user = self.users[0]
+        hydration.hydrate_users([user.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.username = 'renamed'
+            user.profile_picture = 'profiles/new.png'
+            user.save()
+        card = hydration.hydrate_users([user.id])[user.id]
+        self.assertEqual(card['username'], 'renamed')
+        self.assertTrue(card['profile_picture'].endswith('profiles/new.png'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        self.assertEqual(hydration.hydrate_users([user.id]), {})
+
+
+class ProfileConditionalGetTests(TestCase):
+    """
+    The profile answers If-None-Match with 304 until it changes.
+    """
+
+    # Read replicas (test mirrors) serve the profile
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = User.objects.create_user('user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.etag = self.client.get('/api/accounts/profile/')['ETag']
+
+    def get(self):
+        return self.client.get('/api/accounts/profile/', HTTP_IF_NONE_MATCH=self.etag)
+
+    def test_unchanged_then_edited(self):
+        self.assertEqual(self.get().status_code, 304)
+
+        self.client.put('/api/accounts/profile/', {'bio': 'Hello'}, format='multipart')
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['bio'], 'Hello')
+
+    def test_new_follower(self):
+        services.follow(User.objects.create_user('fan'), self.user)
+        self.assertEqual(self.get().status_code, 200)
+
+
+class FollowGraphCacheTests(TestCase):
+    """
+    Lists are served from process memory, then the shared cache; a follow
+    drops both lists it touches, and a list read before the follow commits
+    is never cached as current.
+    """
+
+    def setUp(self):
+        cache.clear()
+        graph.clear_local()
+        self.user = User.objects.create_user('user')
+        self.target = User.objects.create_user('target')
+
+    def test_stale_set_after_invalidation(self):
+        load = graph._load
+
+        def racing_load(direction, user_id):
+            # The reader has read the old list when the follow commits
+            ids = load(direction, user_id)
+            with self.captureOnCommitCallbacks(execute=True):
+                services.follow(self.user, self.target)
+            return ids
+
+        with mock.patch.object(graph, '_load', side_effect=racing_load):
+            self.assertNotIn(self.target.id, graph.following_ids(self.user.id, local=False))
+
+        self.assertIn(self.target.id, graph.following_ids(self.user.id, local=False))
+
+    def test_layers(self):
+        services.follow(self.user, self.target)
+        graph.clear_local()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(list(graph.following_ids(self.user.id)), [self.target.id])
+        # Process memory, then the shared cache
+        with self.assertNumQueries(0):
+            self.assertIn(self.target.id, graph.following_ids(self.user.id))
+        graph.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(list(graph.following_ids(self.user.id)), [self.target.id])
+
+    def test_edges_invalidate_both_lists(self):
+        self.assertFalse(graph.is_following(self.user.id, self.target.id))
+        self.assertEqual(len(graph.follower_ids(self.target.id)), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.follow(self.user, self.target)
+        self.assertTrue(graph.is_following(self.user.id, self.target.id))
+        self.assertEqual(list(graph.follower_ids(self.target.id)), [self.user.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            services.unfollow(self.user, self.target)
+        self.assertFalse(graph.is_following(self.user.id, self.target.id))
+        self.assertEqual(len(graph.follower_ids(self.target.id)), 0)
+
+    @override_settings(FOLLOW_GRAPH_MAX_CACHED_IDS=0)
+    def test_large_lists_are_not_shared(self):
+        services.follow(self.user, self.target)
+
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                graph.follower_ids(self.target.id, local=False)
+
+
+@override_settings(AUTH_TOKEN_MAX_AGE=3600, AUTH_TOKEN_IDLE_TIMEOUT=600)
+class TokenLifecycleTests(TestCase):
+    """
+    Tokens rotate per device, expire by age or idleness, and are purged
+    only once expired, counting uses not yet written to the database.
+    """
+
+    def setUp(self):
+        cache.clear()
+        authentication.clear_local()
+        self.user = User.objects.create_user('user')
+        self.client = APIClient()
+
+    def tearDown(self):
+        # Also cancels the flush timer started by touch()
+        tokens.flush()
+
+    def get_profile(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return self.client.get('/api/accounts/profile/')
+
+    def age(self, token, **fields):
+        AuthToken.objects.filter(key=token.key).update(**fields)
+        cache.clear()
+        authentication.clear_local()
+
+    def test_rotation_per_device(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            phone = tokens.issue(self.user, 'phone')
+        self.assertEqual(self.get_profile(phone).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            laptop = tokens.issue(self.user, 'laptop')
+            rotated = tokens.issue(self.user, 'phone')
+
+        self.assertEqual(self.get_profile(phone).status_code, 401)
+        self.assertEqual(self.get_profile(laptop).status_code, 200)
+        self.assertEqual(self.get_profile(rotated).status_code, 200)
+
+    def test_idle_and_max_age_expiry(self):
+        idle = tokens.issue(self.user, 'idle')
+        old = tokens.issue(self.user, 'old')
+        now = timezone.now()
+        self.age(idle, last_used_at=now - timedelta(seconds=601))
+        self.age(old, issued_at=now - timedelta(seconds=3601), last_used_at=now)
+
+        for token in (idle, old):
+            response = self.get_profile(token)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.data['detail'], 'Token has expired.')
+
+    def test_purge(self):
+        fresh = tokens.issue(self.user, 'fresh')
+        active = tokens.issue(self.user, 'active')
+        idle = tokens.issue(self.user, 'idle')
+        old = tokens.issue(self.user, 'old')
+        stale = timezone.now() - timedelta(seconds=601)
+        self.age(active, last_used_at=stale)
+        self.age(idle, last_used_at=stale)
+        self.age(old, issued_at=stale - timedelta(seconds=3600))
+
+        # Used, but the process exits before flushing last_used_at
+        tokens.touch(active.key)
+        tokens._pending.clear()
+
+        out = StringIO()
+        call_command('purge_tokens', batch_size=1, stdout=out)
+
+        self.assertIn('Deleted 2 expired token(s).', out.getvalue())
+        self.assertCountEqual(
+            AuthToken.objects.values_list('key', flat=True),
+            [fresh.key, active.key]
+        )
+
+
+class TokenCacheTests(TestCase):
+    """
+    Token lookups are served from the cache until the token is deleted or
+    its user changes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        authentication.clear_local()
+        self.user = User.objects.create_user('user')
+        self.token = tokens.issue(self.user, 'phone')
+        self.backend = authentication.CachedTokenAuthentication()
+
+    def tearDown(self):
+        tokens.flush()
+
+    def authenticate(self):
+        return self.backend.authenticate_credentials(self.token.key)
+
+    def assertRejected(self, message):
+        with self.assertRaisesMessage(AuthenticationFailed, message):
+            self.authenticate()
+
+    def test_cached_layers(self):
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate()
+        self.assertEqual(user.username, 'user')
+
+        with self.assertNumQueries(0):
+            self.authenticate()
+        authentication.clear_local()
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+        # Saves that touch no snapshot field keep the entry
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_logout(self):
+        self.authenticate()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post('/api/accounts/logout/').status_code, 200)
+        self.assertRejected('Invalid token.')
+
+    def test_deactivated_user(self):
+        self.authenticate()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertRejected('User inactive or deleted.')
+
+    def test_deleted_user(self):
+        self.authenticate()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertRejected('Invalid token.')
+
+
+class ClientIpTests(SimpleTestCase):
+    """
+    Forwarded addresses are used only from trusted proxies.
+    """
+
+    def get(self, forwarded=None):
+        headers = {'REMOTE_ADDR': '10.0.0.2'}
+        if forwarded is not None:
+            headers['HTTP_X_FORWARDED_FOR'] = forwarded
+        return limits.client_ip(RequestFactory().get('/', **headers))
+
+    def test_remote_addr_by_default(self):
+        self.assertEqual(self.get('203.0.113.9'), '10.0.0.2')
+
+    @override_settings(TRUSTED_PROXY_HEADER='X-Forwarded-For', TRUSTED_PROXY_COUNT=2)
+    def test_trusted_hops(self):
+        # Spoofed entry, client (added by the first proxy), first proxy
+        self.assertEqual(self.get('1.2.3.4, 203.0.113.9, 10.0.0.1'), '203.0.113.9')
+        self.assertEqual(self.get('203.0.113.9,10.0.0.1'), '203.0.113.9')
+        self.assertEqual(self.get('10.0.0.1'), '10.0.0.2')
+        self.assertEqual(self.get(), '10.0.0.2')
+
+
+class PasswordViewTests(TestCase):
+    """
+    Register stores the hash computed on the pool; login checks it.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def tearDown(self):
+        tokens.flush()
+
+    def test_register_then_login(self):
+        credentials = {'username': 'new', 'password': 'correct horse'}
+        response = self.client.post('/api/accounts/register/', credentials, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(username='new').check_password('correct horse'))
+
+        response = self.client.post('/api/accounts/login/', credentials, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AuthToken.objects.get(user__username='new').key, response.json()['token'])
+
+        response = self.client.post(
+            '/api/accounts/login/', {**credentials, 'password': 'wrong'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_serializer_hashes_without_pool(self):
+        serializer = RegisterSerializer(data={'username': 'direct', 'password': 'secret pw'})
+        self.assertTrue(serializer.is_valid())
+        # One INSERT, with the hash already set
+        with self.assertNumQueries(1):
+            user = serializer.save()
+        self.assertTrue(user.check_password('secret pw'))
+
+
+class FollowServiceTests(TestCase):
+    """
+    Follow changes keep the counters exact and queue one notification per
+    new follow; the lists show the edges newest first.
+    """
+
+    def setUp(self):
+        cache.clear()
+        graph.clear_local()
+        self.user = User.objects.create_user('user')
+        self.others = [User.objects.create_user(f'other{index}') for index in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counts(self, user):
+        user.refresh_from_db()
+        return user.following_count, user.followers_count
+
+    def test_bulk_follow_skips_self_unknown_and_existing(self):
+        first, second, third = self.others
+        services.follow(self.user, first)
+
+        response = self.client.post(
+            '/api/accounts/follow/',
+            {'user_ids': [first.id, second.id, third.id, self.user.id, 999999]},
+            format='json'
+        )
+
+        self.assertEqual(response.data['followed'], [second.id, third.id])
+        self.assertEqual(self.counts(self.user), (3, 0))
+        self.assertEqual([self.counts(other) for other in self.others], [(0, 1)] * 3)
+        self.assertEqual(
+            sorted(NotificationEvent.objects.values_list('recipient_id', flat=True)),
+            [first.id, second.id, third.id]
+        )
+
+        # Repeating the request changes nothing
+        response = self.client.post('/api/accounts/follow/', {'user_ids': [second.id]}, format='json')
+        self.assertEqual(response.data['followed'], [])
+        self.assertEqual(self.counts(self.user), (3, 0))
+        self.assertEqual(NotificationEvent.objects.count(), 3)
+
+    def test_bulk_unfollow(self):
+        first, second, third = self.others
+        services.bulk_follow(self.user, [first.id, second.id])
+
+        response = self.client.post(
+            '/api/accounts/unfollow/', {'user_ids': [first.id, third.id]}, format='json'
+        )
+
+        self.assertEqual(response.data['unfollowed'], [first.id])
+        self.assertEqual(self.counts(self.user), (1, 0))
+        self.assertEqual([self.counts(other) for other in self.others], [(0, 0), (0, 1), (0, 0)])
+
+    def test_single_follow_and_unfollow(self):
+        first = self.others[0]
+        self.assertTrue(services.follow(self.user, first))
+        self.assertFalse(services.follow(self.user, first))
+        self.assertEqual(self.counts(first), (0, 1))
+
+        self.assertTrue(services.unfollow(self.user, first))
+        self.assertFalse(services.unfollow(self.user, first))
+        self.assertEqual(self.counts(first), (0, 0))
+        self.assertEqual(self.counts(self.user), (0, 0))
+
+    def test_lists(self):
+        first, second, third = self.others
+        services.follow(self.user, second)
+        services.follow(self.user, first)
+        services.follow(third, self.user)
+
+        response = self.client.get(f'/api/accounts/{self.user.id}/following/')
+        self.assertEqual([row['username'] for row in response.data['results']], ['other0', 'other1'])
+
+        response = self.client.get(f'/api/accounts/{self.user.id}/followers/')
+        self.assertEqual([row['username'] for row in response.data['results']], ['other2'])
+
+
+class TwoHopScoreTests(SimpleTestCase):
+    """
+    Path counts on a small graph: 1 follows 2, 3 and 4, who between them
+    reach 5 three times, 6 twice and 7 once.
+    """
+
+    edges = np.array([
+        (1, 2), (1, 3), (1, 4),
+        (2, 5), (3, 5), (4, 5),
+        (2, 6), (3, 6),
+        (4, 7),
+        # Back to the user, and to an account they already follow
+        (2, 1), (2, 3),
+    ], dtype=np.int64)
+
+    def scores(self, owners, limit=10, max_following=10):
+        result = suggestions.two_hop_scores(np.array(owners, dtype=np.int64), self.edges, limit, max_following)
+        return [tuple(values) for values in zip(*(array.tolist() for array in result))]
+
+    def test_path_counts_exclude_self_and_followed(self):
+        self.assertEqual(self.scores([1]), [(1, 5, 3), (1, 6, 2), (1, 7, 1)])
+
+    def test_top_n_per_owner(self):
+        # 2 follows 1, 3, 5 and 6; through 1 it reaches 4 (2 and 3 are excluded)
+        self.assertEqual(self.scores([1, 2], limit=2), [(1, 5, 3), (1, 6, 2), (2, 4, 1)])
+
+    def test_hubs_are_skipped(self):
+        # 2 follows four accounts: above the cutoff, so its paths are dropped
+        self.assertEqual(self.scores([1], max_following=3), [(1, 5, 2), (1, 6, 1), (1, 7, 1)])
+
+    def test_empty(self):
+        self.assertEqual(self.scores([]), [])
+        self.assertEqual(self.scores([99]), [])
+
+
+class SuggestionTests(TestCase):
+    """
+    `compute_suggestions` drains the refresh queue; the endpoint pages the
+    stored rows best first.
+    """
+
+    def setUp(self):
+        cache.clear()
+        graph.clear_local()
+        self.users = {name: User.objects.create_user(name) for name in ['me', 'a', 'b', 'x', 'y', 'z']}
+        for follower, followee in [
+            ('me', 'a'), ('me', 'b'),
+            ('a', 'x'), ('b', 'x'), ('a', 'y'), ('b', 'z'),
+        ]:
+            services.follow(self.users[follower], self.users[followee])
+
+    def test_compute_drains_queue(self):
+        self.assertTrue(SuggestionRefresh.objects.exists())
+
+        call_command('compute_suggestions', batch_size=2, stdout=StringIO())
+
+        self.assertFalse(SuggestionRefresh.objects.exists())
+        self.assertEqual(
+            list(
+                FollowSuggestion.objects.filter(user=self.users['me'])
+                .order_by('-score', 'candidate_id')
+                .values_list('candidate__username', 'score')
+            ),
+            [('x', 2), ('y', 1), ('z', 1)]
+        )
+
+        # Following a suggestion removes it at once and queues a refresh
+        services.follow(self.users['me'], self.users['x'])
+        self.assertFalse(FollowSuggestion.objects.filter(candidate=self.users['x']).exists())
+        self.assertTrue(SuggestionRefresh.objects.filter(user=self.users['me']).exists())
+
+    @override_settings(SUGGESTIONS_PER_USER=1)
+    def test_settings(self):
+        call_command('compute_suggestions', '--all', stdout=StringIO())
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(user=self.users['me']).values_list('candidate__username', flat=True)),
+            ['x']
+        )
+
+        # a and b each follow two accounts
+        with self.settings(SUGGESTIONS_MAX_HUB_FOLLOWING=1):
+            suggestions.compute_for([self.users['me'].id])
+        self.assertFalse(FollowSuggestion.objects.filter(user=self.users['me']).exists())
+
+    def test_endpoint_pages(self):
+        suggestions.compute_for([self.users['me'].id])
+        client = APIClient()
+        client.force_authenticate(self.users['me'])
+
+        rows, url = [], '/api/accounts/suggestions/?page_size=1'
+        while url:
+            response = client.get(url)
+            self.assertEqual(len(response.data['results']), 1)
+            rows += [(row['user']['username'], row['score']) for row in response.data['results']]
+            url = response.data['next']
+
+        self.assertEqual(rows[0], ('x', 2))
+        self.assertCountEqual(rows[1:], [('y', 1), ('z', 1)])
+
+
+def image_file(name='avatar.png', size=(300, 200), image_format='PNG'):
+    buffer = BytesIO()
+    mode = 'RGB' if image_format == 'JPEG' else 'RGBA'
+    Image.new(mode, size, (200, 30, 30, 128)[:len(mode)]).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+@override_settings(AVATAR_WORKERS=0)
+class AvatarTests(TestCase):
+    """
+    Uploads are validated from the header, rendered into square variants
+    after commit, and old variants are removed when the picture changes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = self.settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user('user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, file):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put('/api/accounts/profile/', {'profile_picture': file}, format='multipart')
+
+    def variants(self):
+        self.user.refresh_from_db()
+        return avatars.variant_paths(self.user)
+
+    def test_upload_renders_variants(self):
+        response = self.upload(image_file())
+        self.assertEqual(response.status_code, 200)
+
+        paths = self.variants()
+        self.assertEqual(sorted(paths), ['medium', 'medium_webp', 'small', 'small_webp'])
+        for key, edge in [('small', 64), ('medium_webp', 256)]:
+            with default_storage.open(paths[key]) as file, Image.open(file) as image:
+                self.assertEqual(image.size, (edge, edge))
+
+    def test_rejections(self):
+        with self.settings(AVATAR_MAX_UPLOAD_SIZE=100):
+            response = self.upload(image_file())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most', response.data['profile_picture'][0])
+
+        with self.settings(AVATAR_MAX_DIMENSION=250):
+            response = self.upload(image_file())
+        self.assertEqual(response.status_code, 400)
+
+        response = self.upload(SimpleUploadedFile('avatar.png', b'not an image'))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.get(pk=self.user.pk).profile_picture)
+
+    def test_replacing_deletes_old_variants(self):
+        self.upload(image_file())
+        old = self.variants()
+
+        self.upload(image_file('other.jpg', image_format='JPEG'))
+        new = self.variants()
+
+        self.assertTrue(new)
+        self.assertTrue(set(new.values()).isdisjoint(old.values()))
+        self.assertFalse(any(default_storage.exists(path) for path in old.values()))
+        self.assertTrue(all(default_storage.exists(path) for path in new.values()))
+
+    def test_cleared_picture(self):
+        self.upload(image_file())
+        old = self.variants()
+
+        # Cleared after the job was queued: nothing is rendered for it
+        User.objects.filter(pk=self.user.pk).update(profile_picture='')
+        self.assertFalse(avatars.process(self.user.pk))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_picture_variants, {})
+        self.assertFalse(any(default_storage.exists(path) for path in old.values()))
+
+    def test_process_avatars_command(self):
+        self.upload(image_file())
+        User.objects.filter(pk=self.user.pk).update(profile_picture_variants={})
+
+        out = StringIO()
+        call_command('process_avatars', stdout=out)
+        self.assertIn('Rendered thumbnails for 1 user(s).', out.getvalue())
+        self.assertTrue(self.variants())
+
+        out = StringIO()
+        call_command('process_avatars', stdout=out)
+        self.assertIn('Rendered thumbnails for 0 user(s).', out.getvalue())
@@ -0,0 +1,166 @@
+"""
+API token lifecycle.
+
+- issue():  a login replaces the user's token for that device
+- expiry:   AUTH_TOKEN_MAX_AGE after issue or AUTH_TOKEN_IDLE_TIMEOUT after
+            last use, checked on authentication
+- touch():  records use; each token is marked at most once per
+            AUTH_TOKEN_TOUCH_INTERVAL (cache.add), and marked tokens are
+            written together in one UPDATE after FLUSH_INTERVAL seconds
+            (a timer, so an idle worker still flushes), at FLUSH_SIZE
+            tokens, or when the process exits
+- expired_tokens(): what `manage.py purge_tokens` deletes, after
+            sync_last_used() has saved uses a killed process never flushed
+            (each use is also recorded in the shared cache)
+"""
+
+import atexit
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+
+from social_media_api import replicas
+from .models import AuthToken
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 10.0
+FLUSH_SIZE = 100
+
+_pending = set()
+_pending_lock = threading.Lock()
+_timer = None
+
+
+def token_digest(key):
+    """
+    Hash used in place of the raw token in cache keys.
+    """
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def issue(user, device=''):
+    """
+    Rotate the user's token for `device` and return the new AuthToken.
+    """
+
+    with transaction.atomic():
+        # Deleting (not updating) sends post_delete, which drops the old
+        # token from the authentication cache
+        AuthToken.objects.filter(user=user, device=device).delete()
+        token = AuthToken.objects.create(
+            key=AuthToken.generate_key(),
+            user=user,
+            device=device
+        )
+
+    # A new login or account reads its own writes (replicas.py)
+    replicas.pin_to_primary(user.pk)
+    return token
+
+
+def is_expired(issued_at, last_used_at, now=None):
+    now = now or timezone.now()
+    return (
+        issued_at < now - timedelta(seconds=settings.AUTH_TOKEN_MAX_AGE) or
+        last_used_at < now - timedelta(seconds=settings.AUTH_TOKEN_IDLE_TIMEOUT)
+    )
+
+
+def expired_tokens(now=None):
+    now = now or timezone.now()
+    return AuthToken.objects.filter(
+        last_used_at__lt=now - timedelta(seconds=settings.AUTH_TOKEN_IDLE_TIMEOUT)
+    ) | AuthToken.objects.filter(
+        issued_at__lt=now - timedelta(seconds=settings.AUTH_TOKEN_MAX_AGE)
+    )
+
+
+def _used_key(key):
+    return f'auth-token:used:{token_digest(key)}'
+
+
+def touch(key):
+    """
+    Record that a token was used. Cheap enough to call on every request.
+    """
+
+    global _timer
+
+    if not cache.add(f'auth-token:touched:{token_digest(key)}', 1, settings.AUTH_TOKEN_TOUCH_INTERVAL):
+        return
+
+    # Survives this process; read back by sync_last_used()
+    cache.set(_used_key(key), timezone.now(), settings.AUTH_TOKEN_IDLE_TIMEOUT)
+
+    with _pending_lock:
+        _pending.add(key)
+        due = len(_pending) >= FLUSH_SIZE
+        if not due and _timer is None:
+            _timer = threading.Timer(FLUSH_INTERVAL, _flush_in_timer)
+            _timer.daemon = True
+            _timer.start()
+    if due:
+        flush()
+
+
+def flush():
+    """
+    Write last_used_at for every token touched since the last flush.
+    """
+
+    global _timer
+
+    with _pending_lock:
+        keys = list(_pending)
+        _pending.clear()
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+
+    if keys:
+        AuthToken.objects.filter(key__in=keys).update(last_used_at=timezone.now())
+
+
+def _flush_in_timer():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Flushing token last_used_at failed')
+    finally:
+        # The timer thread's connection would otherwise stay open
+        connections.close_all()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Flushing token last_used_at at exit failed')
+
+
+def sync_last_used(keys):
+    """
+    Save uses recorded in the shared cache that are newer than the
+    database's last_used_at, e.g. touches of a process that was killed
+    before flushing. Returns the keys whose last_used_at moved forward.
+    """
+
+    keys = list(keys)
+    found = cache.get_many([_used_key(key) for key in keys])
+    synced = []
+    for key in keys:
+        used_at = found.get(_used_key(key))
+        if used_at is not None and AuthToken.objects.filter(
+            key=key, last_used_at__lt=used_at
+        ).update(last_used_at=used_at):
+            synced.append(key)
+    return synced
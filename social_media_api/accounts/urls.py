@@ -1,10 +1,28 @@
 from django.urls import path
-from .views import RegisterView, LoginView, ProfileView, FollowUserView, UnfollowUserView
+from .views import (
+    RegisterView,
+    LoginView,
+    LogoutView,
+    ProfileView,
+    FollowUserView,
+    UnfollowUserView,
+    BulkFollowView,
+    BulkUnfollowView,
+    FollowersView,
+    FollowingView,
+    FollowSuggestionListView,
+)
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('profile/', ProfileView.as_view(), name='profile'),
+    path('follow/', BulkFollowView.as_view(), name='bulk-follow'),
+    path('unfollow/', BulkUnfollowView.as_view(), name='bulk-unfollow'),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow-user'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow-user'),
-]
\ No newline at end of file
+    path('suggestions/', FollowSuggestionListView.as_view(), name='follow-suggestions'),
+    path('<int:user_id>/followers/', FollowersView.as_view(), name='user-followers'),
+    path('<int:user_id>/following/', FollowingView.as_view(), name='user-following'),
+]
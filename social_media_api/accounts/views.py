@@ -1,26 +1,46 @@
+import json
+import inspect
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import generics, status, permissions
-from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import filesizeformat
 from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.response import Response
-from django.contrib.contenttypes.models import ContentType
 
-from notifications.models import Notification
+from social_media_api.conditional import conditional_get, make_etag
+from social_media_api.mixins import EagerLoadingViewMixin
+from social_media_api.pagination import KeysetPagination
+from social_media_api.replicas import ReplicaReadMixin
+
+from . import hashing, limits, services, tokens
+from .avatars import AvatarUploadHandler
 
-from .models import User as CustomUser
+from .models import AuthToken, FollowSuggestion, User as CustomUser
 from .serializers import UserProfileSerializer
 
 from .serializers import (
     RegisterSerializer,
     LoginSerializer,
-    UserProfileSerializer
+    UserProfileSerializer,
+    SlimUserSerializer,
+    BulkFollowSerializer,
+    FollowSuggestionSerializer
 )
 
 
 User = get_user_model()
+Follow = User.following.through
 
 
 """
@@ -32,46 +52,149 @@ Views handle:
 """
 
 
-class RegisterView(APIView):
+def get_device(data):
     """
-    Registers a new user and returns an authentication token.
+    Optional client-supplied device name; one token is kept per device.
     """
 
-    permission_classes = [permissions.AllowAny]
+    device = data.get('device', '')
+    return device[:100] if isinstance(device, str) else ''
 
-    def post(self, request):
-        serializer = RegisterSerializer(data=request.data)
 
-        if serializer.is_valid():
-            user = serializer.save()
-            token = Token.objects.get(user=user)
+def parse_body(request):
+    """
+    JSON or form-encoded request body as a dict, or None if malformed.
+    """
 
-            return Response(
-                {
-                    'token': token.key,
-                    'user': UserProfileSerializer(user).data
-                },
-                status=status.HTTP_201_CREATED
-            )
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def too_busy(status_code, detail):
+    response = JsonResponse({'detail': detail}, status=status_code)
+    response['Retry-After'] = '1'
+    return response
 
-class LoginView(APIView):
+
+async def authenticate_user(username, password):
     """
-    Authenticates a user and returns an existing token.
+    Async counterpart of django.contrib.auth.authenticate() for username and
+    password: the lookup runs here, the hash check on the hashing pool.
     """
 
-    permission_classes = [permissions.AllowAny]
+    user = await User._default_manager.filter(
+        **{User.USERNAME_FIELD: username}
+    ).afirst()
 
-    def post(self, request):
-        serializer = LoginSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+    matches, new_hash = await hashing.acheck_password(
+        password,
+        user.password if user is not None else None
+    )
+    if not matches or not user.is_active:
+        return None
 
-        user = serializer.validated_data
-        token, _ = Token.objects.get_or_create(user=user)
+    # Stored with outdated hasher parameters: keep the upgraded hash
+    if new_hash:
+        user.password = new_hash
+        await user.asave(update_fields=['password'])
 
-        return Response(
+    return user
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class PasswordView(ABC, View):
+    """
+    Abstract base for async views that hash passwords; never routed
+    itself. Subclasses implement handle().
+
+    Hashing is awaited on a bounded pool (accounts/hashing.py) and each
+    client IP and username may only have a few requests in flight
+    (accounts/limits.py), so a login burst cannot tie up the server.
+    """
+
+    http_method_names = ['post']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        if inspect.isabstract(cls):
+            raise TypeError(f'{cls.__name__} is abstract and cannot be routed.')
+        return super().as_view(**initkwargs)
+
+    async def post(self, request):
+        data = parse_body(request)
+        if data is None:
+            return JsonResponse({'detail': 'Malformed request body.'}, status=400)
+
+        username = data.get('username')
+        try:
+            async with limits.concurrency_limit(request, username if isinstance(username, str) else ''):
+                return await self.handle(request, data)
+        except limits.LimitExceeded:
+            return too_busy(429, 'Too many concurrent attempts, retry shortly.')
+        except hashing.HashingOverloaded:
+            return too_busy(503, 'Server busy, retry shortly.')
+
+    @abstractmethod
+    async def handle(self, request, data):
+        """
+        Respond to a request holding its concurrency slots.
+        """
+
+
+class RegisterView(PasswordView):
+    """
+    Registers a new user and returns an authentication token.
+    """
+
+    async def handle(self, request, data):
+        serializer = RegisterSerializer(data=data)
+
+        # Field validation includes the unique-username query
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=400)
+
+        password_hash = await hashing.ahash_password(serializer.validated_data['password'])
+        user = await sync_to_async(serializer.save)(password_hash=password_hash)
+        token = await sync_to_async(tokens.issue)(user, get_device(data))
+
+        return JsonResponse(
+            {
+                'token': token.key,
+                'user': UserProfileSerializer(user).data
+            },
+            status=201
+        )
+
+
+class LoginView(PasswordView):
+    """
+    Authenticates a user and returns a new token for the device,
+    replacing the previous one.
+    """
+
+    async def handle(self, request, data):
+        serializer = LoginSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+
+        user = await authenticate_user(
+            serializer.validated_data['username'],
+            serializer.validated_data['password']
+        )
+        if user is None:
+            return JsonResponse(
+                {'non_field_errors': ['Invalid username or password']},
+                status=400
+            )
+
+        token = await sync_to_async(tokens.issue)(user, get_device(data))
+
+        return JsonResponse(
             {
                 'token': token.key,
                 'user': UserProfileSerializer(user).data
@@ -79,21 +202,65 @@ class LoginView(APIView):
         )
 
 
-class ProfileView(APIView):
+class LogoutView(APIView):
+    """
+    Deletes the token used for this request.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        # QuerySet.delete() sends post_delete, which clears the token cache
+        AuthToken.objects.filter(key=request.auth.key).delete()
+        return Response(
+            {"detail": "Logged out."},
+            status=status.HTTP_200_OK
+        )
+
+
+class ProfileView(ReplicaReadMixin, APIView):
     """
     Retrieve or update the authenticated user's profile.
+    GET reads from a replica unless the user recently wrote.
     """
 
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_user(self, request):
+        # request.user only carries the cached auth snapshot
+        return User.objects.get(pk=request.user.pk)
+
     def get(self, request):
-        serializer = UserProfileSerializer(request.user)
+        user = self.get_user(request)
+        etag = make_etag(
+            'profile',
+            user.pk,
+            user.username,
+            user.email,
+            user.bio,
+            user.profile_picture.name,
+            user.profile_picture_variants,
+            user.followers_count,
+            user.following_count
+        )
+        return conditional_get(request, etag, self._get, user)
+
+    def _get(self, request, user):
+        serializer = UserProfileSerializer(user)
         return Response(serializer.data)
 
     def put(self, request):
+        # Stream a multipart picture to a temporary file, not into memory
+        upload_handler = AvatarUploadHandler(request)
+        request.upload_handlers = [upload_handler]
+        data = request.data
+        if upload_handler.too_large:
+            limit = filesizeformat(settings.AVATAR_MAX_UPLOAD_SIZE)
+            raise ValidationError({'profile_picture': [f'Images may be at most {limit}.']})
+
         serializer = UserProfileSerializer(
-            request.user,
-            data=request.data,
+            self.get_user(request),
+            data=data,
             partial=True
         )
         serializer.is_valid(raise_exception=True)
@@ -117,17 +284,8 @@ class FollowUserView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Follow the user
-        request.user.following.add(target_user)
-
-        # 🔔 CREATE NOTIFICATION HERE
-        Notification.objects.create(
-            recipient=target_user,
-            actor=request.user,
-            verb='started following you',
-            content_type=ContentType.objects.get_for_model(target_user),
-            object_id=target_user.id
-        )
+        # Follow the user (updates counters, our feed and notifies them)
+        services.follow(request.user, target_user)
 
         return Response(
             {"detail": f"You are now following {target_user.username}."},
@@ -148,9 +306,127 @@ class UnfollowUserView(generics.GenericAPIView):
     def post(self, request, user_id):
         target_user = get_object_or_404(self.queryset, id=user_id)
 
-        request.user.following.remove(target_user)
+        services.unfollow(request.user, target_user)
 
         return Response(
             {"detail": f"You unfollowed {target_user.username}."},
             status=status.HTTP_200_OK
         )
+
+
+class BulkFollowView(generics.GenericAPIView):
+    """
+    Follow many users in one request, e.g. during onboarding:
+    POST {"user_ids": [1, 2, 3]}
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkFollowSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        followed = services.bulk_follow(
+            request.user,
+            serializer.validated_data['user_ids']
+        )
+
+        return Response(
+            {"followed": followed},
+            status=status.HTTP_200_OK
+        )
+
+
+class BulkUnfollowView(generics.GenericAPIView):
+    """
+    Unfollow many users in one request: POST {"user_ids": [1, 2, 3]}
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkFollowSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        unfollowed = services.bulk_unfollow(
+            request.user,
+            serializer.validated_data['user_ids']
+        )
+
+        return Response(
+            {"unfollowed": unfollowed},
+            status=status.HTTP_200_OK
+        )
+
+
+class FollowListView(generics.ListAPIView):
+    """
+    Base for the followers / following lists of a user, newest first.
+
+    Pages are read from the follow through table (keyset on its id) joined
+    to the listed users for the slim columns only.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = SlimUserSerializer
+    pagination_class = KeysetPagination
+
+    # Through-table column holding the requested user, and the relation to
+    # the users being listed
+    filter_field = None
+    user_field = None
+
+    def get_queryset(self):
+        columns = [
+            f'{self.user_field}__{field}'
+            for field in SlimUserSerializer.columns
+        ]
+        return (
+            Follow.objects
+            .filter(**{self.filter_field: self.kwargs['user_id']})
+            .select_related(self.user_field)
+            .only('id', self.user_field, *columns)
+            .order_by('-id')
+        )
+
+    def list(self, request, *args, **kwargs):
+        edges = self.paginate_queryset(self.get_queryset())
+        users = [getattr(edge, self.user_field) for edge in edges]
+        serializer = self.get_serializer(users, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class FollowersView(FollowListView):
+    """
+    Users following the given user.
+    """
+
+    filter_field = 'to_user_id'
+    user_field = 'from_user'
+
+
+class FollowingView(FollowListView):
+    """
+    Users the given user follows.
+    """
+
+    filter_field = 'from_user_id'
+    user_field = 'to_user'
+
+
+class FollowSuggestionListView(EagerLoadingViewMixin, generics.ListAPIView):
+    """
+    "People you may know" for the authenticated user, best first.
+    Served from precomputed rows (see accounts/suggestions.py).
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = FollowSuggestionSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return FollowSuggestion.objects.filter(
+            user=self.request.user
+        ).order_by('-score', 'id')
@@ -0,0 +1,122 @@
+"""
+Database connection load test.
+
+Runs several phases of increasing concurrency against an endpoint that
+queries the database on every request (default: GET /api/accounts/profile/)
+and reports latency and throughput per phase. With --database-url it also
+samples pg_stat_activity while each phase runs, showing how many server
+connections the app holds (total / active / idle).
+
+Compare the connection profiles (DB_CONNECTIONS in settings.py), e.g.
+
+    # persistent connections, sync workers
+    DB_CONNECTIONS=persistent gunicorn social_media_api.wsgi -w 4 --threads 8
+    # pooled connections, ASGI (asgi.py selects the pool)
+    DB_POOL_MAX_SIZE=10 uvicorn social_media_api.asgi:application --workers 4
+
+then:
+
+    python benchmarks/db_connections.py --base-url http://127.0.0.1:8000 \\
+        --database-url "$DATABASE_URL" --concurrency 8 32 128 --duration 15
+
+Expected: persistent connections grow with worker threads (and under ASGI
+with executor threads); the pool stays at or below
+workers x DB_POOL_MAX_SIZE, with requests queueing for a connection rather
+than opening new ones once it is full.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from login_storm import get_token, percentile, summary
+
+CONNECTIONS_QUERY = """
+    SELECT count(*),
+           count(*) FILTER (WHERE state = 'active'),
+           count(*) FILTER (WHERE state LIKE 'idle%')
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND pid <> pg_backend_pid()
+"""
+
+
+async def sample_connections(database_url, stop, samples, interval):
+    import psycopg
+
+    async with await psycopg.AsyncConnection.connect(database_url, autocommit=True) as connection:
+        while not stop.is_set():
+            cursor = await connection.execute(CONNECTIONS_QUERY)
+            samples.append(await cursor.fetchone())
+            await asyncio.sleep(interval)
+
+
+async def client_loop(client, path, headers, stop, latencies, statuses):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def phase(args, token, concurrency):
+    stop = asyncio.Event()
+    latencies, statuses, samples = [], {}, []
+    headers = {'Authorization': f'Token {token}'}
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        tasks = [
+            asyncio.create_task(client_loop(client, args.path, headers, stop, latencies, statuses))
+            for _ in range(concurrency)
+        ]
+        if args.database_url:
+            tasks.append(asyncio.create_task(
+                sample_connections(args.database_url, stop, samples, args.sample_interval)
+            ))
+
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    return latencies, statuses, samples
+
+
+def connections_summary(samples):
+    if not samples:
+        return ''
+    total, active, idle = zip(*samples)
+    return (
+        f"db connections: max={max(total)} mean={statistics.mean(total):.1f} "
+        f"(active max={max(active)}, idle max={max(idle)})"
+    )
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        token = await get_token(client, args.username, args.password)
+
+    print(f"GET {args.path}; {args.duration}s per phase\n")
+
+    for concurrency in args.concurrency:
+        latencies, statuses, samples = await phase(args, token, concurrency)
+        summary(f'c={concurrency}', latencies, statuses)
+        print(f"{'':<10} {len(latencies) / args.duration:.1f} req/s  "
+              f"p99.9={percentile(latencies, 99.9) * 1000:.1f}ms  {connections_summary(samples)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--database-url', help='PostgreSQL URL to sample pg_stat_activity from.')
+    parser.add_argument('--username', default='bench')
+    parser.add_argument('--password', default='bench-password-1')
+    parser.add_argument('--path', default='/api/accounts/profile/', help='Endpoint to load.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 32, 128],
+                        help='Concurrent clients, one phase per value.')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per phase.')
+    parser.add_argument('--sample-interval', type=float, default=0.5,
+                        help='Seconds between pg_stat_activity samples.')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,129 @@
+"""
+Login storm benchmark.
+
+Measures the latency of an unrelated endpoint (default: GET /api/posts/)
+on its own, then again while many clients hammer /api/accounts/login/.
+With password hashing on the bounded pool (accounts/hashing.py) the probe's
+p99 should stay close to the baseline under ASGI; running the same script
+against a build that hashes inline shows the probe stalling behind logins.
+
+Start the server first, e.g.
+
+    uvicorn social_media_api.asgi:application --workers 2
+    # or: gunicorn social_media_api.wsgi -w 4   (sync workers, for comparison)
+
+then:
+
+    python benchmarks/login_storm.py --base-url http://127.0.0.1:8000 \\
+        --username bench --password 'bench-password' --storm 64 --duration 20
+
+The benchmark user is registered if it does not exist. All storm clients
+share one IP and username, so raise AUTH_MAX_CONCURRENT_PER_IP and
+AUTH_MAX_CONCURRENT_PER_USERNAME on the server if every login should be
+hashed rather than rejected with 429.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summary(name, latencies, statuses=None):
+    line = (
+        f"{name:<10} n={len(latencies):<6} "
+        f"p50={percentile(latencies, 50) * 1000:8.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.1f}ms "
+        f"max={max(latencies, default=float('nan')) * 1000:8.1f}ms"
+    )
+    if statuses:
+        line += '  ' + ' '.join(f'{code}:{count}' for code, count in sorted(statuses.items()))
+    print(line)
+
+
+async def get_token(client, username, password):
+    credentials = {'username': username, 'password': password}
+    response = await client.post('/api/accounts/login/', json=credentials)
+    if response.status_code == 400:
+        response = await client.post('/api/accounts/register/', json=credentials)
+    response.raise_for_status()
+    return response.json()['token']
+
+
+async def probe(client, path, token, stop, latencies, interval):
+    headers = {'Authorization': f'Token {token}'}
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(path, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def storm_client(client, username, password, stop, latencies, statuses):
+    credentials = {'username': username, 'password': password, 'device': 'bench'}
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.post('/api/accounts/login/', json=credentials)
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def phase(args, token, storm):
+    stop = asyncio.Event()
+    probe_latencies, login_latencies, statuses = [], [], {}
+    limits = httpx.Limits(max_connections=args.storm + 8)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        tasks = [asyncio.create_task(
+            probe(client, args.probe, token, stop, probe_latencies, args.interval)
+        )]
+        for _ in range(storm):
+            tasks.append(asyncio.create_task(
+                storm_client(client, args.username, args.password, stop, login_latencies, statuses)
+            ))
+
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    return probe_latencies, login_latencies, statuses
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        token = await get_token(client, args.username, args.password)
+
+    print(f"Probe: GET {args.probe}; storm: {args.storm} concurrent logins; {args.duration}s per phase\n")
+
+    probe_latencies, _, _ = await phase(args, token, storm=0)
+    summary('baseline', probe_latencies)
+
+    probe_latencies, login_latencies, statuses = await phase(args, token, storm=args.storm)
+    summary('probe', probe_latencies)
+    summary('login', login_latencies, statuses)
+
+    if login_latencies:
+        print(f"\nlogin throughput: {len(login_latencies) / args.duration:.1f}/s, "
+              f"mean {statistics.mean(login_latencies) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--username', default='bench')
+    parser.add_argument('--password', default='bench-password-1')
+    parser.add_argument('--probe', default='/api/posts/', help='Unrelated endpoint to measure.')
+    parser.add_argument('--storm', type=int, default=64, help='Concurrent login clients.')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per phase.')
+    parser.add_argument('--interval', type=float, default=0.05, help='Pause between probe requests.')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,207 @@
+"""
+Notification dispatch.
+
+Views call notify() instead of creating Notification rows. The event is
+queued in the NotificationEvent table inside the caller's transaction and a
+worker (`manage.py process_notifications`) turns queued events into
+notifications in batches with bulk_create.
+
+- At-least-once: an event is only deleted in the same transaction that
+  writes its notification.
+- Dedup: identical pending events collapse (unique constraint), and an actor
+  among the matching unread notification's recent_actor_ids (the last
+  NOTIFICATIONS_TRACKED_ACTORS distinct actors) is not counted twice.
+- Aggregation: events with the same (recipient, verb, object) within
+  NOTIFICATIONS_AGGREGATION_WINDOW update one unread row's actor,
+  actor_count, latest_actors and recent_actor_ids instead of inserting a
+  new row, so the rows written do not grow with the number of actors.
+  Workers lock the recipients and the rows they extend, so concurrent
+  workers never create two aggregates or count one actor twice.
+- Backpressure: when the queue grows past NOTIFICATIONS_MAX_BACKLOG, the
+  request that enqueues also drains one batch after it commits.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationEvent
+from .unread import invalidate_unread
+
+User = get_user_model()
+
+# Seconds between backlog size checks in each process
+BACKLOG_CHECK_INTERVAL = 5.0
+# Usernames kept on an aggregated notification
+LATEST_ACTORS = 3
+
+_backlog_checked_at = 0.0
+_backlogged = False
+
+
+def notify(recipient_id, actor_id, verb, target):
+    """
+    Queue a single notification for the recipient about `target`.
+    Takes user ids so callers never need to load the related users.
+    """
+
+    enqueue([
+        NotificationEvent(
+            recipient_id=recipient_id,
+            actor_id=actor_id,
+            verb=verb,
+            content_type=ContentType.objects.get_for_model(target),
+            object_id=target.id,
+        )
+    ])
+
+
+def enqueue(events):
+    """
+    Queue several NotificationEvent instances in one INSERT.
+    """
+
+    if not events:
+        return
+
+    NotificationEvent.objects.bulk_create(events, ignore_conflicts=True)
+
+    if settings.NOTIFICATIONS_EAGER or _is_backlogged():
+        transaction.on_commit(process_batch)
+
+
+def _is_backlogged():
+    """
+    Cheap, periodically refreshed check of the queue length.
+    """
+
+    global _backlog_checked_at, _backlogged
+
+    now = time.monotonic()
+    if now - _backlog_checked_at >= BACKLOG_CHECK_INTERVAL:
+        limit = settings.NOTIFICATIONS_MAX_BACKLOG
+        # COUNT over a LIMIT subquery: cost is bounded by the limit
+        _backlogged = NotificationEvent.objects.all()[:limit + 1].count() > limit
+        _backlog_checked_at = now
+
+    return _backlogged
+
+
+def _group_key(item):
+    return (
+        item.recipient_id,
+        item.verb,
+        item.content_type_id,
+        item.object_id,
+    )
+
+
+def process_batch(batch_size=None):
+    """
+    Turn up to `batch_size` queued events into notifications.
+    Returns the number of events consumed.
+    """
+
+    batch_size = batch_size or settings.NOTIFICATIONS_BATCH_SIZE
+    now = timezone.now()
+    window_start = now - timedelta(seconds=settings.NOTIFICATIONS_AGGREGATION_WINDOW)
+
+    with transaction.atomic():
+        events = list(
+            NotificationEvent.objects.select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        # One worker at a time per recipient (in id order, so workers never
+        # deadlock); otherwise two could both create the same aggregate
+        recipient_ids = sorted({event.recipient_id for event in events})
+        list(
+            User.objects.select_for_update()
+            .filter(id__in=recipient_ids)
+            .order_by('id')
+            .values_list('id')
+        )
+
+        # Distinct actors per (recipient, verb, object), oldest first
+        groups = {}
+        for event in events:
+            actors = groups.setdefault(_group_key(event), [])
+            if event.actor_id not in actors:
+                actors.append(event.actor_id)
+
+        usernames = dict(
+            User.objects.filter(
+                id__in={event.actor_id for event in events}
+            ).values_list('id', 'username')
+        )
+
+        # Recent unread notifications the events can be merged into, locked
+        # so a concurrent mark-as-read cannot hide the actors added here
+        open_notifications = {
+            _group_key(notification): notification
+            for notification in Notification.objects.select_for_update().filter(
+                recipient_id__in=recipient_ids,
+                object_id__in={event.object_id for event in events},
+                is_read=False,
+                timestamp__gte=window_start,
+            ).order_by('timestamp')
+        }
+        tracked = settings.NOTIFICATIONS_TRACKED_ACTORS
+
+        created, updated = [], []
+        for key, actor_ids in groups.items():
+            notification = open_notifications.get(key)
+            is_new = notification is None
+            if is_new:
+                recipient_id, verb, content_type_id, object_id = key
+                notification = Notification(
+                    recipient_id=recipient_id,
+                    verb=verb,
+                    content_type_id=content_type_id,
+                    object_id=object_id,
+                    actor_count=0,
+                    latest_actors=[],
+                    recent_actor_ids=[],
+                )
+
+            changed = False
+            for actor_id in actor_ids:
+                # Dedup: the actor is already counted on this notification
+                if actor_id in notification.recent_actor_ids:
+                    continue
+                notification.actor_id = actor_id
+                notification.actor_count += 1
+                notification.latest_actors = [
+                    usernames.get(actor_id),
+                    *notification.latest_actors
+                ][:LATEST_ACTORS]
+                notification.recent_actor_ids = [
+                    actor_id,
+                    *notification.recent_actor_ids
+                ][:tracked]
+                changed = True
+
+            if is_new:
+                created.append(notification)
+            elif changed:
+                notification.timestamp = now
+                updated.append(notification)
+
+        Notification.objects.bulk_create(created)
+        Notification.objects.bulk_update(
+            updated,
+            ['actor', 'actor_count', 'latest_actors', 'recent_actor_ids', 'timestamp']
+        )
+        NotificationEvent.objects.filter(
+            id__in=[event.id for event in events]
+        ).delete()
+
+    invalidate_unread(notification.recipient_id for notification in created)
+    return len(events)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_latest_actors(apps, schema_editor):
+    # Earlier actors of existing aggregates are unknown; record the latest
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationActor = Notification.actors.through
+    NotificationActor.objects.bulk_create(
+        [
+            NotificationActor(notification_id=notification_id, user_id=actor_id)
+            for notification_id, actor_id in Notification.objects.values_list('id', 'actor_id')
+        ],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_aggregation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actors',
+            field=models.ManyToManyField(related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(record_latest_actors, migrations.RunPython.noop),
+    ]
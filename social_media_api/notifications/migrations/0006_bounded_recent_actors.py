@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_recent_actors(apps, schema_editor):
+    # Keep the newest tracked actors of each notification (through rows are
+    # inserted in counting order, so a higher id is a later actor)
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationActor = Notification.actors.through
+    limit = settings.NOTIFICATIONS_TRACKED_ACTORS
+
+    recent = {}
+    for notification_id, user_id in NotificationActor.objects.order_by('-id').values_list(
+        'notification_id', 'user_id'
+    ).iterator():
+        actor_ids = recent.setdefault(notification_id, [])
+        if len(actor_ids) < limit:
+            actor_ids.append(user_id)
+
+    Notification.objects.bulk_update(
+        [
+            Notification(id=notification_id, recent_actor_ids=actor_ids)
+            for notification_id, actor_ids in recent.items()
+        ],
+        ['recent_actor_ids'],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_notification_actors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='recent_actor_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(copy_recent_actors, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='notification',
+            name='actors',
+        ),
+    ]
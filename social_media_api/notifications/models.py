@@ -32,8 +32,69 @@ class Notification(models.Model):
     object_id = models.PositiveIntegerField()
     target = GenericForeignKey('content_type', 'object_id')
 
+    # Aggregation: similar events within NOTIFICATIONS_AGGREGATION_WINDOW
+    # update one row ("alice and 41 others liked your post"). `actor` is the
+    # most recent actor; `latest_actors` holds the newest usernames.
+    actor_count = models.PositiveIntegerField(default=1)
+    latest_actors = models.JSONField(default=list, blank=True)
+    # Ids of the last NOTIFICATIONS_TRACKED_ACTORS distinct actors counted
+    # in actor_count, newest first, so a repeat action by any of them is not
+    # counted again. Bounded to keep aggregation to one row write; an actor
+    # who dropped off the list is counted again (actor_count is approximate
+    # past that many actors).
+    recent_actor_ids = models.JSONField(default=list, blank=True)
+
     is_read = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Inbox reads (unread first, newest first) and unread counts
+            models.Index(
+                fields=['recipient', 'is_read', '-timestamp'],
+                name='notification_inbox_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.actor} {self.verb}"
+
+
+class NotificationEvent(models.Model):
+    """
+    A queued notification waiting to be written by the dispatcher worker
+    (see notifications/dispatch.py). Rows are inserted in the same
+    transaction as the action that triggered them and deleted once the
+    Notification has been created, which gives at-least-once delivery.
+    """
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    verb = models.CharField(max_length=255)
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    object_id = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Repeated actions collapse into one pending event
+            models.UniqueConstraint(
+                fields=['recipient', 'actor', 'verb', 'content_type', 'object_id'],
+                name='unique_pending_notification'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Pending: {self.actor} {self.verb}"
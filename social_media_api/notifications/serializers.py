@@ -1,16 +1,57 @@
 from rest_framework import serializers
+
+from accounts.hydration import UserCardField, UserCardListSerializer
 from .models import Notification
 
 
 class NotificationSerializer(serializers.ModelSerializer):
-    actor = serializers.StringRelatedField()
+    # The actor comes from the batched user cards (accounts/hydration.py)
+    actor = UserCardField(source='actor_id', attribute='username')
+    actor_detail = UserCardField(source='actor_id')
+    message = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
+        list_serializer_class = UserCardListSerializer
         fields = [
             'id',
             'actor',
+            'actor_detail',
+            'actor_count',
+            'latest_actors',
             'verb',
+            'message',
             'is_read',
             'timestamp'
         ]
+
+    def get_message(self, obj):
+        """
+        Human readable summary, e.g. "alice and 41 others liked your post".
+        """
+
+        actor = self.fields['actor'].to_representation(obj.actor_id)
+        others = obj.actor_count - 1
+        if others <= 0:
+            return f"{actor} {obj.verb}"
+        noun = 'other' if others == 1 else 'others'
+        return f"{actor} and {others} {noun} {obj.verb}"
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """
+    Validates a bulk mark-as-read request: either explicit ids, or every
+    notification up to a timestamp (the newest one the client has seen).
+    """
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=500,
+        required=False
+    )
+    up_to = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if not data.get('ids') and 'up_to' not in data:
+            raise serializers.ValidationError("Provide 'ids' or 'up_to'.")
+        return data
@@ -1,3 +1,164 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from posts.models import Post
+from social_media_api.testing import QueryCountGuardMixin
+
+from .dispatch import notify, process_batch
+from .models import Notification, NotificationEvent
+
+User = get_user_model()
+
+
+class NotificationListQueryCountTests(QueryCountGuardMixin, TestCase):
+    """
+    The inbox must run the same number of queries for any page size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipient = User.objects.create_user('recipient')
+        content_type = ContentType.objects.get_for_model(User)
+
+        for index in range(12):
+            actor = User.objects.create_user(f'actor{index}')
+            Notification.objects.create(
+                recipient=cls.recipient,
+                actor=actor,
+                verb='started following you',
+                content_type=content_type,
+                object_id=cls.recipient.id
+            )
+
+    def test_notification_list(self):
+        client = APIClient()
+        client.force_authenticate(self.recipient)
+        self.assertQueryCountConstant(client, '/api/notifications/')
+
+
+class DispatchTests(TestCase):
+    """
+    Queued events become notifications once, however often they repeat.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipient = User.objects.create_user('recipient')
+        cls.actors = [User.objects.create_user(f'actor{index}') for index in range(5)]
+        cls.post = Post.objects.create(author=cls.recipient, title='Hello', content='Body')
+
+    def like(self, actor):
+        notify(
+            recipient_id=self.recipient.id,
+            actor_id=actor.id,
+            verb='liked your post',
+            target=self.post
+        )
+
+    def test_pending_duplicates_collapse(self):
+        self.like(self.actors[0])
+        self.like(self.actors[0])
+        self.assertEqual(NotificationEvent.objects.count(), 1)
+
+        self.assertEqual(process_batch(), 1)
+        self.assertEqual(NotificationEvent.objects.count(), 0)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_id, self.actors[0].id)
+        self.assertEqual(notification.actor_count, 1)
+
+    def test_repeat_after_processing_is_not_counted_again(self):
+        self.like(self.actors[0])
+        process_batch()
+        self.like(self.actors[0])
+        process_batch()
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 1)
+
+    def test_similar_events_aggregate(self):
+        for actor in self.actors[:3]:
+            self.like(actor)
+        process_batch()
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_id, self.actors[2].id)
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.latest_actors, ['actor2', 'actor1', 'actor0'])
+
+    def test_earlier_actor_is_not_counted_again(self):
+        # actor0 is no longer among the latest usernames when it repeats
+        for actor in self.actors:
+            self.like(actor)
+            process_batch()
+        self.like(self.actors[0])
+        process_batch()
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, len(self.actors))
+        self.assertEqual(notification.actor_id, self.actors[-1].id)
+
+    @override_settings(NOTIFICATIONS_TRACKED_ACTORS=2)
+    def test_tracked_actors_are_bounded(self):
+        for actor in self.actors[:3]:
+            self.like(actor)
+            process_batch()
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recent_actor_ids, [self.actors[2].id, self.actors[1].id])
+
+        # A tracked actor is not counted again; one that dropped off is
+        self.like(self.actors[1])
+        process_batch()
+        self.like(self.actors[0])
+        process_batch()
+
+        notification.refresh_from_db()
+        self.assertEqual(notification.actor_count, 4)
+        self.assertEqual(notification.recent_actor_ids, [self.actors[0].id, self.actors[2].id])
+
+
+class InboxConditionalGetTests(TestCase):
+    """
+    The inbox answers If-None-Match with 304 until a notification arrives or
+    is read.
+    """
+
+    # Read replicas (test mirrors) serve the inbox
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipient = User.objects.create_user('recipient')
+        cls.actor = User.objects.create_user('actor')
+        cls.post = Post.objects.create(author=cls.recipient, title='Hello', content='Body')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.recipient)
+        self.notify('liked your post')
+        self.etag = self.client.get('/api/notifications/')['ETag']
+
+    def notify(self, verb):
+        notify(recipient_id=self.recipient.id, actor_id=self.actor.id, verb=verb, target=self.post)
+        process_batch()
+
+    def get(self):
+        return self.client.get('/api/notifications/', HTTP_IF_NONE_MATCH=self.etag)
+
+    def test_unchanged(self):
+        self.assertEqual(self.get().status_code, 304)
+
+    def test_new_notification(self):
+        self.notify('commented on your post')
+        self.assertEqual(self.get().status_code, 200)
+
+    def test_mark_read(self):
+        response = self.client.post(
+            '/api/notifications/mark_read/',
+            {'ids': list(Notification.objects.values_list('id', flat=True))},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get().status_code, 200)
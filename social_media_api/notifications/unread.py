@@ -0,0 +1,42 @@
+"""
+Cached unread-notification counters.
+
+The count is computed from the (recipient, is_read, timestamp) index on a
+cache miss and kept for NOTIFICATIONS_UNREAD_CACHE_TTL seconds. Anything
+that creates or reads notifications invalidates the affected users.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from social_media_api.replicas import primary
+from .models import Notification
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user_id):
+    """
+    Number of unread notifications for the user.
+    """
+
+    count = cache.get(_key(user_id))
+    if count is None:
+        # Cache fills read the primary, never a lagging replica
+        with primary():
+            count = Notification.objects.filter(
+                recipient_id=user_id,
+                is_read=False
+            ).count()
+        cache.set(_key(user_id), count, settings.NOTIFICATIONS_UNREAD_CACHE_TTL)
+    return count
+
+
+def invalidate_unread(user_ids):
+    """
+    Drop the cached counters of the given users.
+    """
+
+    cache.delete_many([_key(user_id) for user_id in set(user_ids)])
@@ -1,23 +1,86 @@
+from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db.models import Count, Max, Q
+
+from social_media_api.conditional import ConditionalGetMixin, make_etag
+from social_media_api.pagination import KeysetPagination
+from social_media_api.replicas import ReplicaReadMixin
 
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationSerializer, MarkReadSerializer
+from .unread import unread_count, invalidate_unread
+
+
+class NotificationListView(ReplicaReadMixin, ConditionalGetMixin, generics.ListAPIView):
+    """
+    Returns notifications for the authenticated user, one page at a time.
+    Unread notifications appear first. Read from a replica when available.
+    """
 
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return Notification.objects.filter(
+            recipient=self.request.user
+        ).order_by('is_read', '-timestamp', '-id')
+
+    def get_etag(self, request):
+        # One aggregate over the inbox index: new, merged (timestamp bump),
+        # read and purged notifications all change one of these values
+        stats = Notification.objects.filter(recipient=request.user).aggregate(
+            total=Count('id'),
+            unread=Count('id', filter=Q(is_read=False)),
+            newest=Max('timestamp')
+        )
+        return make_etag(
+            'notifications',
+            request.user.id,
+            stats['total'],
+            stats['unread'],
+            stats['newest'],
+            request.get_full_path()
+        )
 
-class NotificationListView(APIView):
+
+class UnreadCountView(APIView):
     """
-    Returns notifications for the authenticated user.
-    Unread notifications appear first.
+    Returns the number of unread notifications (served from cache).
     """
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        return Response({'unread_count': unread_count(request.user.id)})
+
+
+class MarkReadView(APIView):
+    """
+    Marks notifications as read with a single UPDATE.
+
+    POST {"ids": [1, 2, 3]} or {"up_to": "<timestamp>"}
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
         notifications = Notification.objects.filter(
-            recipient=request.user
-        ).order_by('is_read', '-timestamp')
+            recipient=request.user,
+            is_read=False
+        )
+        if serializer.validated_data.get('ids'):
+            notifications = notifications.filter(id__in=serializer.validated_data['ids'])
+        if 'up_to' in serializer.validated_data:
+            notifications = notifications.filter(timestamp__lte=serializer.validated_data['up_to'])
+
+        updated = notifications.update(is_read=True)
+        if updated:
+            invalidate_unread([request.user.id])
 
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data)
+        return Response({'marked_read': updated})
@@ -0,0 +1,332 @@
+"""
+Versioned read-through cache for post and comment responses.
+
+Writes never delete entries; they bump the version of a "scope" after the
+transaction commits, so every later read misses and old entries simply
+expire. Responses are cached in two layers, so that a like or a comment
+does not throw away every cached page:
+
+- Pages: the ids and next/previous links of one list page, keyed by the
+  list scope's version. A list is bumped only when its membership can
+  change (a post is created, edited or deleted; a comment is added or
+  removed).
+- Rows: one serialized post or comment, keyed by that object's version.
+  Counter updates bump only the object itself.
+
+User cards are not stored in rows: they are filled in from the card cache
+(accounts/hydration.py) for every response, so a profile change shows up
+at once. The ETag is built from the page's row versions and the cards of
+the users in its rows, so the rows themselves are read first (from the
+cache, or the database on a miss); a 304 only saves serializing and
+sending the body.
+
+Scopes:
+- 'posts'              every post list page (including searches)
+- 'post:<id>'          one post
+- 'comments:<post_id>' one post's comment list pages
+- 'comment:<id>'       one comment
+
+With read replicas, a scope written in the last REPLICA_PIN_SECONDS is
+refilled from the primary, so a lagging replica cannot cache stale data
+under the new version. Versions are always read before the data they
+guard, so a concurrent write can never leave old data under a new version.
+"""
+
+import hashlib
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+from rest_framework.response import Response
+
+from accounts.hydration import UserCardField, hydrate_users
+from social_media_api import replicas
+from social_media_api.conditional import conditional_get, make_etag
+
+METRICS_PREFIX = 'response-cache:metrics'
+
+
+def _version_key(scope):
+    return f'response-cache:version:{scope}'
+
+
+def get_version(scope):
+    version = cache.get(_version_key(scope))
+    if version is None:
+        # A fresh timestamp never collides with entries written under a
+        # version that was evicted from the cache
+        cache.add(_version_key(scope), int(time.time() * 1000), None)
+        version = cache.get(_version_key(scope))
+    return version
+
+
+def get_versions(scopes):
+    """
+    Current versions of several scopes as {scope: version}, in one round
+    trip when they all exist.
+    """
+
+    keys = {scope: _version_key(scope) for scope in scopes}
+    found = cache.get_many(list(keys.values()))
+    return {
+        scope: found[key] if key in found else get_version(scope)
+        for scope, key in keys.items()
+    }
+
+
+def _written_key(scope):
+    return f'response-cache:written:{scope}'
+
+
+def _recently_written(scopes):
+    # Only matters while reads go to a replica
+    return replicas.reading_from_replica() and bool(
+        cache.get_many([_written_key(scope) for scope in scopes])
+    )
+
+
+def _bump(scopes):
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), int(time.time() * 1000), None)
+
+    if settings.REPLICA_DATABASES:
+        cache.set_many(
+            {_written_key(scope): True for scope in scopes},
+            settings.REPLICA_PIN_SECONDS
+        )
+
+
+def invalidate(*scopes):
+    """
+    Bump the given scopes once the current transaction commits.
+    """
+
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def invalidate_post(post_id, comments=False):
+    """
+    Invalidate one post (its counters or content changed), and optionally
+    its comment list. Post lists are not affected; bump 'posts' when the
+    set of listed posts can change.
+    """
+
+    scopes = [f'post:{post_id}']
+    if comments:
+        scopes.append(f'comments:{post_id}')
+    invalidate(*scopes)
+
+
+def _page_key(scope, version, request):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'response-cache:page:{scope}:{version}:{url}'
+
+
+def _row_key(scope, version):
+    return f'response-cache:row:{scope}:{version}'
+
+
+def record(scope, outcome):
+    """
+    Count a cache hit or miss for the scope kind ('posts', 'post', 'comments').
+    A response is a hit when its page and every row were cached.
+    """
+
+    key = f"{METRICS_PREFIX}:{scope.split(':')[0]}:{outcome}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_metrics():
+    """
+    Hit/miss counters per scope kind.
+    """
+
+    kinds = ('posts', 'post', 'comments')
+    keys = [f'{METRICS_PREFIX}:{kind}:{outcome}' for kind in kinds for outcome in ('hit', 'miss')]
+    values = cache.get_many(keys)
+    return {
+        kind: {
+            outcome: values.get(f'{METRICS_PREFIX}:{kind}:{outcome}', 0)
+            for outcome in ('hit', 'miss')
+        }
+        for kind in kinds
+    }
+
+
+class CachedRowsMixin:
+    """
+    Generic view mixin that renders posts or comments from the row cache.
+
+    respond_rows() reads each object's row under its current version
+    (scope f'{row_scope}:<id>'), loads the missing ones with one in_bulk(),
+    fills in the user cards and answers 304 when the client's ETag
+    matches. Rows must not depend on the requesting user.
+    """
+
+    row_scope = None
+
+    def get_row_queryset(self):
+        return self.get_serializer_class().Meta.model._default_manager.all()
+
+    def respond_rows(self, request, ids, links=None, metric=None, page_hit=True):
+        """
+        Response for the objects `ids`, in order: a paginated body with
+        `links` ({'next': ..., 'previous': ...}), or the single object when
+        `links` is None. `metric` is the scope to count a hit or miss for.
+        """
+
+        scopes = {pk: f'{self.row_scope}:{pk}' for pk in ids}
+        versions = get_versions(scopes.values())
+        keys = {pk: _row_key(scope, versions[scope]) for pk, scope in scopes.items()}
+        found = cache.get_many(list(keys.values()))
+        rows = {pk: found[key] for pk, key in keys.items() if key in found}
+
+        missing = [pk for pk in ids if pk not in rows]
+        if missing:
+            loaded = self._load_rows(missing, [scopes[pk] for pk in missing])
+            cache.set_many(
+                {keys[pk]: row for pk, row in loaded.items()},
+                settings.RESPONSE_CACHE_TIMEOUT
+            )
+            rows.update(loaded)
+
+        hit = page_hit and not missing
+        if metric is not None:
+            record(metric, 'hit' if hit else 'miss')
+
+        # Deleted since the page was cached (its list was bumped as well)
+        ids = [pk for pk in ids if pk in rows]
+        if links is None and not ids:
+            raise Http404
+
+        serializer = self.get_serializer()
+        cards = hydrate_users(
+            user_id for pk in ids for user_id in rows[pk]['users'].values()
+        )
+        etag = make_etag(
+            request.get_full_path(),
+            [(scopes[pk], versions[scopes[pk]]) for pk in ids],
+            sorted((user_id, sorted(card.items())) for user_id, card in cards.items())
+        )
+
+        def render(request):
+            serializer.context['user_cards'] = cards
+            results = [self._embed(serializer, rows[pk]) for pk in ids]
+            if links is None:
+                return Response(results[0])
+            return Response({
+                'next': links['next'],
+                'previous': links['previous'],
+                'results': results,
+            })
+
+        response = conditional_get(request, etag, render)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    def _load_rows(self, ids, scopes):
+        with replicas.primary() if _recently_written(scopes) else nullcontext():
+            instances = self.get_row_queryset().in_bulk(ids)
+
+        objects = [instances[pk] for pk in ids if pk in instances]
+        serializer = self.get_serializer(objects, many=True)
+        card_fields = self._card_fields(serializer.child)
+
+        return {
+            obj.pk: {
+                'fields': {
+                    name: value for name, value in data.items()
+                    if name not in card_fields
+                },
+                'users': {
+                    field.source: getattr(obj, field.source)
+                    for field in card_fields.values()
+                },
+            }
+            for obj, data in zip(objects, serializer.data)
+        }
+
+    @staticmethod
+    def _card_fields(serializer):
+        return {
+            name: field for name, field in serializer.fields.items()
+            if isinstance(field, UserCardField)
+        }
+
+    def _embed(self, serializer, row):
+        card_fields = self._card_fields(serializer)
+        return {
+            name: (
+                field.to_representation(row['users'][field.source])
+                if name in card_fields else row['fields'][name]
+            )
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        }
+
+
+class CachedResponseMixin(CachedRowsMixin):
+    """
+    ViewSet mixin that serves `list` and `retrieve` from the cache.
+
+    Views define get_cache_scope(action) returning the scope for the
+    current request (the list scope, or the object's row scope for
+    `retrieve`), or None to skip caching.
+    """
+
+    def get_cache_scope(self, action):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        scope = self.get_cache_scope('list')
+        if scope is None:
+            return super().list(request, *args, **kwargs)
+
+        key = _page_key(scope, get_version(scope), request)
+        page = cache.get(key)
+        page_hit = page is not None
+        if not page_hit:
+            page = self._load_page(scope)
+            cache.set(key, page, settings.RESPONSE_CACHE_TIMEOUT)
+
+        return self.respond_rows(request, page['ids'], links=page, metric=scope, page_hit=page_hit)
+
+    def retrieve(self, request, *args, **kwargs):
+        scope = self.get_cache_scope('retrieve')
+        try:
+            pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except (KeyError, ValueError):
+            scope = None
+        if scope is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        return self.respond_rows(request, [pk], metric=scope)
+
+    def _load_page(self, scope):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        # Only the columns the cursor needs; rows come from the row cache
+        ordering = self.paginator.get_ordering(queryset)
+        columns = [
+            field.lstrip('-') for field in ordering
+            if field.lstrip('-') not in queryset.query.annotations
+        ]
+
+        with replicas.primary() if _recently_written([scope]) else nullcontext():
+            objects = self.paginate_queryset(queryset.only(*columns))
+
+        return {
+            'ids': [obj.pk for obj in objects],
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
+        }
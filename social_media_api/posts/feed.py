@@ -0,0 +1,206 @@
+"""
+Materialized home feed.
+
+New posts are pushed into one FeedEntry row per follower (fan-out-on-write),
+so a feed page is a range scan of the (user, -created_at, -post) index
+instead of a filter and sort over the whole posts table. Posts by authors
+with very large audiences are not fanned out (Post.fanned_out = False) and
+are pulled in when the feed is read; the flag is per post, so those posts
+stay in the feed after the author drops back below the limit.
+"""
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from accounts import graph
+from social_media_api.pagination import KeysetPagination
+
+from .models import FeedEntry, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+PULL_AUTHORS_KEY = 'feed:pull-authors'
+PULL_AUTHORS_TTL = 60
+
+# Feed order; FeedEntry stores each post's position as (created_at, post_id)
+FEED_ORDERING = ('-created_at', '-id')
+
+# One post's place in the feed; the posts themselves are rendered from the
+# row cache (posts/cache.py)
+FeedItem = namedtuple('FeedItem', ['id', 'created_at'])
+
+
+def _bulk_insert(entries):
+    FeedEntry.objects.bulk_create(
+        entries,
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """
+    Push a newly created post into the feed of every follower of its author.
+    Returns the number of feeds written, or 0 if the post is pulled instead.
+    """
+
+    # Fresh count: post.author may be a cached request.user
+    followers_count = (
+        User.objects.filter(pk=post.author_id)
+        .values_list('followers_count', flat=True)
+        .first()
+    )
+
+    # Too many followers: readers pull this post instead
+    if followers_count > settings.FEED_FANOUT_MAX_FOLLOWERS:
+        Post.objects.filter(pk=post.pk).update(fanned_out=False)
+        post.fanned_out = False
+        # Let readers see a newly pull-only author before the TTL runs out
+        if post.author_id not in cache.get(PULL_AUTHORS_KEY, ()):
+            cache.delete(PULL_AUTHORS_KEY)
+        return 0
+
+    # Skip the process-local layer: a follow committed a moment ago in
+    # another process must still receive this post
+    follower_ids = graph.follower_ids(post.author_id, local=False)
+
+    _bulk_insert([
+        FeedEntry(user_id=user_id, post_id=post.id, created_at=post.created_at)
+        for user_id in follower_ids
+    ])
+    return len(follower_ids)
+
+
+def backfill_feed(user, followee):
+    """
+    Copy the followee's most recent posts into the user's feed.
+    Called right after the user starts following them.
+    """
+
+    backfill_feeds(user, [followee.id])
+
+
+def backfill_feeds(user, followee_ids):
+    """
+    backfill_feed for several followees in one query: the most recent
+    FEED_BACKFILL_LIMIT posts of each.
+    """
+
+    recent_posts = (
+        Post.objects.filter(author_id__in=followee_ids)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('created_at').desc(), F('id').desc()]
+        ))
+        .filter(rank__lte=settings.FEED_BACKFILL_LIMIT)
+        .values_list('id', 'created_at')
+    )
+
+    _bulk_insert([
+        FeedEntry(user_id=user.id, post_id=post_id, created_at=created_at)
+        for post_id, created_at in recent_posts
+    ])
+
+
+def prune_feed(user, followee):
+    """
+    Remove the followee's posts from the user's feed after an unfollow.
+    """
+
+    prune_feeds(user, [followee.id])
+
+
+def prune_feeds(user, followee_ids):
+    """
+    prune_feed for several followees in one DELETE.
+    """
+
+    FeedEntry.objects.filter(user=user, post__author_id__in=followee_ids).delete()
+
+
+def _pull_only_authors():
+    # The (small) set of authors with posts that were not fanned out,
+    # shared by every feed read
+    author_ids = cache.get(PULL_AUTHORS_KEY)
+    if author_ids is None:
+        author_ids = list(
+            Post.objects.filter(fanned_out=False)
+            .order_by()
+            .values_list('author_id', flat=True)
+            .distinct()
+        )
+        cache.set(PULL_AUTHORS_KEY, author_ids, PULL_AUTHORS_TTL)
+    return author_ids
+
+
+def pull_author_ids(user):
+    """
+    Ids of followed authors with posts that were not fanned out on write.
+    """
+
+    following = graph.following_ids(user.id)
+    return [author_id for author_id in _pull_only_authors() if author_id in following]
+
+
+def _entry_field(field):
+    return field.replace('id', 'post_id') if field.lstrip('-') == 'id' else field
+
+
+def _merge(pages, ordering, limit):
+    # Backfilled entries can repeat a pulled post; keep one of each
+    items = {item.id: item for page in pages for item in page}
+    descending = ordering[0].startswith('-')
+    return sorted(
+        items.values(),
+        key=lambda item: (item.created_at, item.id),
+        reverse=descending
+    )[:limit]
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Keyset pagination for the home feed, keyed on (created_at, post id).
+
+    The view's queryset is the user's FeedEntry rows. A page is one range
+    scan of those entries, merged with the same window of pulled posts
+    (post_pull_idx); neither query sorts more than the page. The page is a
+    list of FeedItems; the view loads the posts by id (in_bulk() for the
+    ones not in the row cache).
+    """
+
+    def get_ordering(self, queryset):
+        return FEED_ORDERING
+
+    def fetch(self, queryset, ordering, values, limit):
+        entry_ordering = [_entry_field(field) for field in ordering]
+        entries = queryset.order_by(*entry_ordering)
+        if values is not None:
+            entries = entries.filter(self._after(entry_ordering, values))
+        page = [
+            FeedItem(*row) for row in entries.values_list('post_id', 'created_at')[:limit]
+        ]
+
+        pull_ids = pull_author_ids(self.request.user)
+        if not pull_ids:
+            return page
+
+        pulled = Post.objects.filter(author_id__in=pull_ids, fanned_out=False).order_by(*ordering)
+        if values is not None:
+            pulled = pulled.filter(self._after(ordering, values))
+        pulled = [FeedItem(*row) for row in pulled.values_list('id', 'created_at')[:limit]]
+        return _merge([page, pulled], ordering, limit)
+
+
+def get_feed_entries(user):
+    """
+    The user's materialized feed (paginate with FeedPagination).
+    """
+
+    return FeedEntry.objects.filter(user=user)
@@ -0,0 +1,107 @@
+"""
+Like / unlike writes.
+
+Each operation is one conditional statement whose row count tells whether
+anything changed, so concurrent taps cannot create duplicate likes or
+drive likes_count out of sync:
+
+- like:   INSERT ... SELECT FROM posts_post ... ON CONFLICT DO NOTHING
+- unlike: DELETE ... WHERE user_id = %s AND post_id = %s
+
+The counter update (and the notification for a new like) happen in the
+same transaction, and only when a row was actually inserted or deleted.
+`ON CONFLICT DO NOTHING` and `RETURNING` are supported by PostgreSQL and
+SQLite (3.35+).
+"""
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from notifications.dispatch import notify
+
+from .cache import invalidate_post
+from .models import Like, Post
+
+LIKE_TABLE = Like._meta.db_table
+POST_TABLE = Post._meta.db_table
+
+# Maximum post ids accepted by liked_post_ids()
+MAX_IDS = 100
+
+
+def like(user_id, post_id):
+    """
+    Like a post. Returns True if the like was new, False if it already
+    existed, or None if the post does not exist.
+    """
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Selecting from posts_post makes a missing post insert nothing
+            # instead of raising a foreign key error
+            cursor.execute(
+                f"""
+                INSERT INTO {LIKE_TABLE} (user_id, post_id, created_at)
+                SELECT %s, id, %s FROM {POST_TABLE} WHERE id = %s
+                ON CONFLICT DO NOTHING
+                """,
+                [user_id, now, post_id]
+            )
+            if cursor.rowcount == 0:
+                return _exists_or_false(post_id)
+
+            cursor.execute(
+                f"""
+                UPDATE {POST_TABLE} SET likes_count = likes_count + 1
+                WHERE id = %s RETURNING author_id
+                """,
+                [post_id]
+            )
+            author_id = cursor.fetchone()[0]
+
+        if author_id != user_id:
+            notify(
+                recipient_id=author_id,
+                actor_id=user_id,
+                verb='liked your post',
+                target=Post(id=post_id)
+            )
+        invalidate_post(post_id)
+
+    return True
+
+
+def unlike(user_id, post_id):
+    """
+    Remove a like. Returns True if a like was removed, False if there was
+    none, or None if the post does not exist.
+    """
+
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user_id=user_id, post_id=post_id).delete()
+        if not deleted:
+            return _exists_or_false(post_id)
+
+        Post.objects.filter(pk=post_id).update(likes_count=F('likes_count') - 1)
+        invalidate_post(post_id)
+
+    return True
+
+
+def _exists_or_false(post_id):
+    # Only the no-op path pays for telling "already done" from "no such post"
+    return False if Post.objects.filter(pk=post_id).exists() else None
+
+
+def liked_post_ids(user_id, post_ids):
+    """
+    The subset of `post_ids` liked by the user, in one query.
+    """
+
+    return set(
+        Like.objects.filter(user_id=user_id, post_id__in=post_ids)
+        .values_list('post_id', flat=True)
+    )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import get_metrics
+
+
+class Command(BaseCommand):
+    """
+    Prints hit/miss counters of the post response cache.
+    """
+
+    help = "Show response cache hit/miss metrics for post endpoints."
+
+    def handle(self, *args, **options):
+        for kind, counts in get_metrics().items():
+            total = counts['hit'] + counts['miss']
+            ratio = counts['hit'] / total if total else 0.0
+            self.stdout.write(
+                f"{kind:<10} hits={counts['hit']:<8} misses={counts['miss']:<8} hit ratio={ratio:.1%}"
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.search import BACKENDS
+
+
+class Command(BaseCommand):
+    """
+    Recreates the full-text index objects for posts and refills the index.
+    Needed on SQLite after a migration rebuilds the posts table (which drops
+    the FTS triggers); harmless to run at any time.
+    """
+
+    help = "Create or rebuild the full-text search index for posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        backend = BACKENDS.get(connection.vendor)
+        if backend is None:
+            raise CommandError(f"No full-text search backend for {connection.vendor}.")
+
+        backend.install(connection)
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt ({connection.vendor})."))
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Like, Post
+
+User = get_user_model()
+Follow = User.following.through
+
+
+def count_of(model, field):
+    """
+    Correlated COUNT(*) of `model` rows pointing at the outer row via `field`.
+    """
+
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('*'))
+            .values('total')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the denormalized counters from the source tables and fixes
+    any rows that drifted. Works through each table in primary key ranges so
+    every UPDATE touches a bounded number of rows.
+    """
+
+    help = "Reconcile Post.comments_count/likes_count and User.followers_count/following_count."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows checked per UPDATE (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        targets = [
+            (Post, {
+                'comments_count': count_of(Comment, 'post'),
+                'likes_count': count_of(Like, 'post'),
+            }),
+            (User, {
+                'followers_count': count_of(Follow, 'to_user'),
+                'following_count': count_of(Follow, 'from_user'),
+            }),
+        ]
+
+        for model, counters in targets:
+            for field, expression in counters.items():
+                fixed = self.reconcile(model, field, expression, batch_size)
+                self.stdout.write(f"{model.__name__}.{field}: {fixed} row(s) fixed")
+
+        self.stdout.write(self.style.SUCCESS("Counters reconciled."))
+
+    def reconcile(self, model, field, expression, batch_size):
+        last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        fixed = 0
+
+        for start in range(0, last_pk + 1, batch_size):
+            with transaction.atomic():
+                drifted = (
+                    model.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+                    .annotate(actual=expression)
+                    .exclude(**{field: F('actual')})
+                    .values_list('pk', flat=True)
+                )
+                fixed += model.objects.filter(pk__in=list(drifted)).update(
+                    **{field: expression}
+                )
+
+        return fixed
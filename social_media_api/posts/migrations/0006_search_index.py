@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    # Imported here: the index objects are raw SQL owned by posts.search
+    from posts.search import BACKENDS
+
+    backend = BACKENDS.get(schema_editor.connection.vendor)
+    if backend is not None:
+        backend.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled_posts(apps, schema_editor):
+    # Posts by authors above the fan-out limit were never pushed into feeds
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.filter(
+        author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+    ).update(fanned_out=False)
+
+
+def reinstall_search_index(apps, schema_editor):
+    # SQLite adds the column by rebuilding posts_post, which drops the
+    # full-text triggers created in 0006
+    from posts.search import BACKENDS
+
+    backend = BACKENDS.get(schema_editor.connection.vendor)
+    if backend is not None:
+        backend.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_search_index'),
+        ('accounts', '0003_follow_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author', '-created_at', '-id'], name='post_pull_idx'),
+        ),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+        migrations.RunPython(mark_pulled_posts, migrations.RunPython.noop),
+    ]
@@ -17,9 +17,32 @@ class Post(models.Model):
     title = models.CharField(max_length=255)
     content = models.TextField()
 
+    # Denormalized counters, maintained with F() updates by the views
+    # (reconcile with `manage.py reconcile_counters`)
+    comments_count = models.PositiveIntegerField(default=0)
+    likes_count = models.PositiveIntegerField(default=0)
+
+    # False when the author was above FEED_FANOUT_MAX_FOLLOWERS at posting
+    # time: followers' feeds pull the post instead (see posts/feed.py)
+    fanned_out = models.BooleanField(default=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the global post list
+            models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+            # Per-author timelines (feed backfill and pull-based reads)
+            models.Index(fields=['author', '-created_at'], name='post_author_created_idx'),
+            # Pulled posts read into the feed (only the few not fanned out)
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                condition=models.Q(fanned_out=False),
+                name='post_pull_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -44,6 +67,11 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.author} on {self.post}"
 
@@ -70,4 +98,42 @@ class Like(models.Model):
         unique_together = ('user', 'post')
 
     def __str__(self):
-        return f"{self.user} liked {self.post}"
\ No newline at end of file
+        return f"{self.user} liked {self.post}"
+
+
+class FeedEntry(models.Model):
+    """
+    One row per (follower, post) in a user's materialized home feed.
+    Filled when a post is created (fan-out-on-write) so that a feed page
+    is a range scan on (user, created_at, post).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    # Copied from the post so the feed can be ordered without a join
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-post'],
+                name='feed_user_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.post} in {self.user}'s feed"
@@ -13,4 +13,5 @@ class IsOwnerOrReadOnly(BasePermission):
             return True
 
         # Write permissions are only allowed to the author
-        return obj.author == request.user
+        # Compare ids so the author row is never loaded
+        return obj.author_id == request.user.id
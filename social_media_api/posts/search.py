@@ -0,0 +1,193 @@
+"""
+Full-text search for posts.
+
+DRF's SearchFilter compiles to `ILIKE '%term%'` on title and content, which
+scans the whole posts table. The backends below use a real full-text index
+instead and rank the results:
+
+- PostgreSQL: a generated tsvector column with a GIN index
+- SQLite: an FTS5 table kept in sync by triggers (local development)
+
+The index objects are created by migration posts 0006 (or by
+`manage.py rebuild_search_index`). Databases without a backend fall back
+to the regular SearchFilter behaviour.
+"""
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from rest_framework import filters
+
+from .models import Post
+
+TABLE = Post._meta.db_table
+
+
+class BaseSearchBackend:
+    """
+    Interface for a post search backend.
+    """
+
+    vendor = None
+
+    def install(self, connection):
+        """
+        Create (if needed) and fill the index objects.
+        """
+        raise NotImplementedError
+
+    def is_installed(self, connection):
+        return True
+
+    def search(self, queryset, terms):
+        """
+        Filter `queryset` to posts matching all `terms`, annotated with
+        `search_rank` and ordered best match first.
+        """
+        raise NotImplementedError
+
+    def _ranked(self, queryset, match_sql, rank_sql, params):
+        return (
+            queryset
+            .filter(RawSQL(match_sql, params, output_field=BooleanField()))
+            # Double precision (ts_rank is float4), so the rank stored in a
+            # pagination cursor compares equal to the row it came from
+            .annotate(search_rank=Cast(
+                RawSQL(rank_sql, params, output_field=FloatField()),
+                FloatField()
+            ))
+            .order_by('-search_rank', '-created_at', '-id')
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    tsvector column generated from title (weight A) and content (weight B),
+    so it is kept in sync on every save without application code.
+    """
+
+    vendor = 'postgresql'
+    config = 'english'
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('{self.config}', coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('{self.config}', coalesce(content, '')), 'B')
+                ) STORED
+            """)
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS post_search_vector_idx
+                ON {TABLE} USING GIN (search_vector)
+            """)
+
+    def search(self, queryset, terms):
+        query = f"websearch_to_tsquery('{self.config}', %s)"
+        return self._ranked(
+            queryset,
+            f"{TABLE}.search_vector @@ {query}",
+            f"ts_rank({TABLE}.search_vector, {query})",
+            (' '.join(terms),)
+        )
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    External-content FTS5 table over posts_post, maintained by triggers.
+    Ranked with bm25 (negated so that higher is better), title matches
+    weighted above content matches.
+    """
+
+    vendor = 'sqlite'
+    fts_table = f'{TABLE}_fts'
+
+    def install(self, connection):
+        fts = self.fts_table
+        statements = [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                title, content, content='{TABLE}', content_rowid='id',
+                tokenize='porter unicode61'
+            )""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {TABLE} BEGIN
+                INSERT INTO {fts}(rowid, title, content) VALUES (new.id, new.title, new.content);
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {TABLE} BEGIN
+                INSERT INTO {fts}({fts}, rowid, title, content)
+                VALUES ('delete', old.id, old.title, old.content);
+            END""",
+            # Only text changes re-index; counter updates do not fire this
+            f"""CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF title, content ON {TABLE} BEGIN
+                INSERT INTO {fts}({fts}, rowid, title, content)
+                VALUES ('delete', old.id, old.title, old.content);
+                INSERT INTO {fts}(rowid, title, content) VALUES (new.id, new.title, new.content);
+            END""",
+            f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        ]
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+    def is_installed(self, connection):
+        return self.fts_table in connection.introspection.table_names()
+
+    def search(self, queryset, terms):
+        fts = self.fts_table
+        # Quote every term so user input cannot inject FTS5 syntax;
+        # the trailing * makes each term a prefix match.
+        query = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        return self._ranked(
+            queryset,
+            f"{TABLE}.id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)",
+            f"(SELECT -bm25({fts}, 10.0, 1.0) FROM {fts} WHERE {fts} MATCH %s AND rowid = {TABLE}.id)",
+            (query,)
+        )
+
+
+BACKENDS = {
+    backend.vendor: backend
+    for backend in (PostgresSearchBackend(), SQLiteSearchBackend())
+}
+
+_installed = {}
+
+
+def get_search_backend(using='default'):
+    """
+    The search backend for a database alias, or None to fall back to
+    SearchFilter. Controlled by settings.POSTS_SEARCH_BACKEND
+    ('auto' picks by database vendor, 'none' disables full-text search).
+    """
+
+    if settings.POSTS_SEARCH_BACKEND == 'none':
+        return None
+
+    connection = connections[using]
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        return None
+
+    if using not in _installed:
+        _installed[using] = backend.is_installed(connection)
+    return backend if _installed[using] else None
+
+
+class PostSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that uses the full-text backend when one is available.
+    Keeps the same `?search=` parameter and `search_fields` fallback.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        backend = get_search_backend(queryset.db)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        return backend.search(queryset, terms)
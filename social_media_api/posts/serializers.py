@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from accounts.hydration import UserCardField, UserCardListSerializer
 from .models import Post, Comment
 
 User = get_user_model()
@@ -8,25 +9,29 @@ User = get_user_model()
 class PostSerializer(serializers.ModelSerializer):
     """
     Serializer for Post objects.
+    The author is embedded from the batched user cards (accounts/hydration.py),
+    so post queries do not join the users table.
     """
 
-    author = serializers.ReadOnlyField(source='author.username')
-    comments_count = serializers.IntegerField(
-        source='comments.count',
-        read_only=True
-    )
+    author = UserCardField(source='author_id', attribute='username')
+    author_detail = UserCardField(source='author_id')
 
     class Meta:
         model = Post
+        list_serializer_class = UserCardListSerializer
         fields = [
             'id',
             'author',
+            'author_detail',
             'title',
             'content',
             'comments_count',
+            'likes_count',
             'created_at',
             'updated_at',
         ]
+        # Denormalized counters, maintained by the views
+        read_only_fields = ['comments_count', 'likes_count']
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -34,15 +39,19 @@ class CommentSerializer(serializers.ModelSerializer):
     Serializer for Comment objects.
     """
 
-    author = serializers.ReadOnlyField(source='author.username')
-    post = serializers.ReadOnlyField(source='post.id')
+    author = UserCardField(source='author_id', attribute='username')
+    author_detail = UserCardField(source='author_id')
+    # Read the FK column directly instead of loading the post
+    post = serializers.ReadOnlyField(source='post_id')
 
     class Meta:
         model = Comment
+        list_serializer_class = UserCardListSerializer
         fields = [
             'id',
             'post',
             'author',
+            'author_detail',
             'content',
             'created_at',
             'updated_at',
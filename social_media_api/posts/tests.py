@@ -1,3 +1,519 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from importlib import import_module
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts import graph, services, tokens
+from notifications.models import NotificationEvent
+from social_media_api.testing import QueryCountGuardMixin
+
+from .models import Comment, FeedEntry, Like, Post
+from .feed import fan_out_post
+
+User = get_user_model()
+
+
+class ListQueryCountTests(QueryCountGuardMixin, TestCase):
+    """
+    List endpoints must run the same number of queries for any page size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user('reader')
+        cls.post = Post.objects.create(
+            author=cls.reader, title='Hello', content='First post'
+        )
+
+        # A distinct author per row so a per-row author lookup would show up
+        for index in range(12):
+            author = User.objects.create_user(f'author{index}')
+            services.follow(cls.reader, author)
+            post = Post.objects.create(
+                author=author, title=f'Post {index}', content='Body'
+            )
+            fan_out_post(post)
+            Comment.objects.create(post=cls.post, author=author, content='Nice')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_post_list(self):
+        self.assertQueryCountConstant(self.client, '/api/posts/')
+
+    def test_comment_list(self):
+        self.assertQueryCountConstant(
+            self.client, f'/api/posts/{self.post.id}/comments/'
+        )
+
+    def test_feed(self):
+        self.assertQueryCountConstant(self.client, '/api/feed/')
+
+
+@override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+class FeedTests(TestCase):
+    """
+    Fanned-out and pulled posts page together, newest first.
+    """
+
+    # Read replicas (test mirrors) serve the feed and post lists
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        graph.clear_local()
+        self.reader = User.objects.create_user('reader')
+        self.other = User.objects.create_user('other')
+        self.author = User.objects.create_user('author')
+        self.star = User.objects.create_user('star')
+
+        services.follow(self.reader, self.author)
+        services.follow(self.reader, self.star)
+        # Two followers: above the limit, so the star's posts are pulled
+        services.follow(self.other, self.star)
+        cache.clear()
+        graph.clear_local()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def post(self, author, title):
+        post = Post.objects.create(author=author, title=title, content='Body')
+        fan_out_post(post)
+        return post
+
+    def read_feed(self, page_size=2):
+        ids, url = [], f'/api/feed/?page_size={page_size}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [post['id'] for post in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_merges_fanned_out_and_pulled_posts(self):
+        posts = [self.post(author, f'Post {index}') for index, author in enumerate(
+            [self.author, self.star, self.star, self.author, self.star]
+        )]
+
+        self.assertEqual(self.read_feed(), [post.id for post in reversed(posts)])
+        self.assertFalse(posts[1].fanned_out)
+        self.assertTrue(posts[0].fanned_out)
+
+    def test_pulled_posts_stay_after_author_drops_below_limit(self):
+        post = self.post(self.star, 'Famous')
+        services.unfollow(self.other, self.star)
+        cache.clear()
+        graph.clear_local()
+
+        self.assertEqual(self.read_feed(), [post.id])
+
+    def test_backfill_command(self):
+        posts = [
+            Post.objects.create(author=author, title='Old', content='Body')
+            for author in [self.author, self.star, self.author]
+        ]
+        FeedEntry.objects.all().delete()
+
+        # The edges, then one backfill (select + insert) per follower, not
+        # per follow edge: the reader's two followees share a query
+        with self.assertNumQueries(5):
+            call_command('backfill_feeds', stdout=io.StringIO())
+
+        self.assertEqual(
+            set(FeedEntry.objects.filter(user=self.reader).values_list('post_id', flat=True)),
+            {post.id for post in posts}
+        )
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.other).values_list('post_id', flat=True)),
+            [posts[1].id]
+        )
+
+
+class CursorPaginationTests(TestCase):
+    """
+    Cursors walk every row exactly once, also across ties in the ordering.
+    """
+
+    # Read replicas (test mirrors) serve the feed and post lists
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader')
+        for index in range(7):
+            Post.objects.create(author=cls.user, title=f'Post {index}', content='same words')
+        # Every post on the same instant: only the id breaks the tie
+        Post.objects.update(created_at=timezone.now())
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def ids(self, pages):
+        return [post['id'] for page in pages for post in page['results']]
+
+    def test_next_links_cover_ties_once(self):
+        pages = self.walk('/api/posts/?page_size=3')
+
+        expected = list(Post.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(self.ids(pages), expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_previous_link_returns_the_same_page(self):
+        first, second = self.walk('/api/posts/?page_size=3')[:2]
+
+        response = self.client.get(second['previous'])
+        self.assertEqual(response.data['results'], first['results'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_search_rank_ties(self):
+        # Identical content ranks equally; the cursor must keep its place
+        pages = self.walk('/api/posts/?search=words&page_size=2')
+
+        self.assertEqual(sorted(self.ids(pages)), sorted(Post.objects.values_list('id', flat=True)))
+        self.assertEqual(len(self.ids(pages)), Post.objects.count())
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/posts/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class ResponseCacheTests(TestCase):
+    """
+    Likes invalidate only the liked post; user cards are never stale.
+    """
+
+    # Read replicas (test mirrors) serve the feed and post lists
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user('reader')
+        cls.author = User.objects.create_user('author')
+        services.follow(cls.reader, cls.author)
+        cls.posts = []
+        for index in range(3):
+            post = Post.objects.create(author=cls.author, title=f'Post {index}', content='Body')
+            fan_out_post(post)
+            cls.posts.append(post)
+
+    def setUp(self):
+        cache.clear()
+        graph.clear_local()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def like(self, post):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/posts/{post.id}/like/')
+
+    def test_like_keeps_other_pages_cached(self):
+        # Newest first: page 1 holds posts 2 and 1, page 2 holds post 0
+        first = self.client.get('/api/posts/?page_size=2')
+        self.like(self.posts[0])
+
+        response = self.client.get('/api/posts/?page_size=2')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['ETag'], first['ETag'])
+
+        response = self.client.get(f'/api/posts/{self.posts[0].id}/')
+        self.assertEqual(response.data['likes_count'], 1)
+
+    def test_liked_post_changes_the_page_etag(self):
+        first = self.client.get('/api/posts/?page_size=2')
+        self.like(self.posts[2])
+
+        response = self.client.get('/api/posts/?page_size=2', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['likes_count'], 1)
+
+    def test_card_change_shows_in_cached_pages(self):
+        self.client.get('/api/posts/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.username = 'renamed'
+            self.author.save()
+
+        response = self.client.get('/api/posts/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual({post['author'] for post in response.data['results']}, {'renamed'})
+
+    def test_feed_not_modified(self):
+        first = self.client.get('/api/feed/?page_size=2')
+        self.like(self.posts[0])
+
+        response = self.client.get('/api/feed/?page_size=2', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class FeedConditionalGetTests(TestCase):
+    """
+    The feed answers If-None-Match with 304 until one of its posts, or the
+    page itself, changes.
+    """
+
+    # Read replicas (test mirrors) serve the feed
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user('reader')
+        cls.author = User.objects.create_user('author')
+        services.follow(cls.reader, cls.author)
+        cls.post = Post.objects.create(author=cls.author, title='First', content='Body')
+        fan_out_post(cls.post)
+
+    def setUp(self):
+        cache.clear()
+        graph.clear_local()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.etag = self.client.get('/api/feed/')['ETag']
+
+    def get(self):
+        return self.client.get('/api/feed/', HTTP_IF_NONE_MATCH=self.etag)
+
+    def test_unchanged(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response.content, b'')
+
+    def test_new_post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_authenticate(self.author)
+            self.client.post('/api/posts/', {'title': 'Second', 'content': 'Body'}, format='json')
+        self.client.force_authenticate(self.reader)
+
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post['title'] for post in response.data['results']], ['Second', 'First'])
+
+    def test_edited_post(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_authenticate(self.author)
+            self.client.patch(f'/api/posts/{self.post.id}/', {'title': 'Edited'}, format='json')
+        self.client.force_authenticate(self.reader)
+
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['title'], 'Edited')
+        self.assertNotEqual(response['ETag'], self.etag)
+
+
+class CounterTests(TestCase):
+    """
+    comments_count and likes_count stay exact as comments and posts are
+    deleted, and the migrations backfill every counter from the rows.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author')
+        self.reader = User.objects.create_user('reader')
+        self.post = Post.objects.create(author=self.author, title='Hello', content='Body')
+        self.other = Post.objects.create(author=self.author, title='Other', content='Body')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def counts(self, post):
+        return Post.objects.values_list('comments_count', 'likes_count').get(pk=post.pk)
+
+    def comment(self, post):
+        response = self.client.post(f'/api/posts/{post.id}/comments/', {'content': 'Nice'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_comment_delete(self):
+        first = self.comment(self.post)
+        self.comment(self.post)
+        self.comment(self.other)
+        self.assertEqual(self.counts(self.post), (2, 0))
+
+        response = self.client.delete(f'/api/posts/{self.post.id}/comments/{first}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counts(self.post), (1, 0))
+        self.assertEqual(self.counts(self.other), (1, 0))
+
+        # Someone else's comment cannot be deleted, and nothing is counted
+        self.client.force_authenticate(self.author)
+        comment_id = Comment.objects.filter(post=self.other).get().id
+        response = self.client.delete(f'/api/posts/{self.other.id}/comments/{comment_id}/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.counts(self.other), (1, 0))
+
+    def test_post_delete(self):
+        self.comment(self.post)
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.comment(self.other)
+        self.client.post(f'/api/posts/{self.other.id}/like/')
+
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/posts/{self.post.id}/')
+        self.assertEqual(response.status_code, 204)
+
+        self.assertFalse(Comment.objects.filter(post_id=self.post.id).exists())
+        self.assertFalse(Like.objects.filter(post_id=self.post.id).exists())
+        self.assertEqual(self.counts(self.other), (1, 1))
+
+    def test_backfill_migrations(self):
+        Comment.objects.create(post=self.post, author=self.reader, content='One')
+        Comment.objects.create(post=self.post, author=self.author, content='Two')
+        Like.objects.create(post=self.post, user=self.reader)
+        services.follow(self.reader, self.author)
+        Post.objects.update(comments_count=7, likes_count=7)
+        User.objects.update(followers_count=7, following_count=7)
+
+        for name in ['posts.migrations.0005_counters', 'accounts.migrations.0003_follow_counters']:
+            import_module(name).populate_counters(apps, None)
+
+        self.assertEqual(self.counts(self.post), (2, 1))
+        self.assertEqual(self.counts(self.other), (0, 0))
+        self.assertEqual(
+            dict(User.objects.values_list('username', 'followers_count')),
+            {'author': 1, 'reader': 0}
+        )
+        self.assertEqual(
+            dict(User.objects.values_list('username', 'following_count')),
+            {'author': 0, 'reader': 1}
+        )
+
+
+class LikeTests(TestCase):
+    """
+    Like and unlike are idempotent and keep likes_count exact.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader')
+        cls.author = User.objects.create_user('author')
+        cls.post = Post.objects.create(author=cls.author, title='Hello', content='Body')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def likes_count(self):
+        return Post.objects.values_list('likes_count', flat=True).get(pk=self.post.pk)
+
+    def test_like_twice(self):
+        response = self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.likes_count(), 1)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 1)
+
+    def test_unlike_twice(self):
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+
+        response = self.client.post(f'/api/posts/{self.post.id}/unlike/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['detail'], 'Post unliked.')
+        response = self.client.post(f'/api/posts/{self.post.id}/unlike/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['detail'], 'You have not liked this post.')
+
+        self.assertEqual(self.likes_count(), 0)
+
+    def test_missing_post(self):
+        self.assertEqual(self.client.post('/api/posts/999/like/').status_code, 404)
+        self.assertEqual(self.client.post('/api/posts/999/unlike/').status_code, 404)
+
+    def test_like_notifies_the_author_once(self):
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+        self.client.post(f'/api/posts/{self.post.id}/like/')
+
+        events = NotificationEvent.objects.filter(recipient=self.author, actor=self.user)
+        self.assertEqual(events.count(), 1)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    """
+    Exports stream every matching post, oldest first, as NDJSON or CSV.
+    """
+
+    # Read replicas (test mirrors) may serve the post queries
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('author')
+        cls.posts = [
+            Post.objects.create(author=cls.user, title=f'Post {number}', content=content)
+            for number, content in enumerate(['apples', 'pears', 'apples and pears'])
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        tokens.flush()
+
+    def export(self, query):
+        response = self.client.get(f'/api/posts/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, body = self.export('')
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [post.id for post in self.posts])
+        self.assertEqual(rows[0]['author'], 'author')
+        self.assertTrue(rows[0]['created_at'].startswith(self.posts[0].created_at.date().isoformat()))
+
+    def test_csv(self):
+        response, body = self.export('?output=csv')
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('filename="posts.csv"', response['Content-Disposition'])
+        header, *rows = csv.reader(io.StringIO(body))
+        self.assertEqual(header[:4], ['id', 'author', 'title', 'content'])
+        self.assertEqual([row[3] for row in rows], ['apples', 'pears', 'apples and pears'])
+
+    def test_unknown_output(self):
+        self.assertEqual(self.client.get('/api/posts/export/?output=xml').status_code, 400)
+
+    def test_search(self):
+        _, body = self.export('?search=pears&output=csv')
+
+        _, *rows = csv.reader(io.StringIO(body))
+        self.assertCountEqual([row[3] for row in rows], ['pears', 'apples and pears'])
+
+    async def test_asgi_streams_async_iterator(self):
+        token = await sync_to_async(tokens.issue)(self.user)
+        response = await AsyncClient().get(
+            '/api/posts/export/', headers={'Authorization': f'Token {token.key}'}
+        )
+
+        self.assertTrue(response.is_async)
+        body = b''.join([piece async for piece in response.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), len(self.posts))
@@ -1,53 +1,108 @@
-from rest_framework import viewsets, permissions, filters, status, generics
-from rest_framework.pagination import PageNumberPagination
+from rest_framework import viewsets, permissions, status, generics
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
 
-from .models import Post, Comment, Like
+from .models import Post, Comment
 from .serializers import PostSerializer, CommentSerializer
 from .permissions import IsOwnerOrReadOnly
-from notifications.models import Notification
-
-
-class StandardResultsSetPagination(PageNumberPagination):
-    """
-    Standard pagination for list endpoints.
-    """
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 50
-
-
-class PostViewSet(viewsets.ModelViewSet):
+from .feed import FeedPagination, fan_out_post, get_feed_entries
+from .search import PostSearchFilter
+from . import likes
+from .cache import CachedResponseMixin, CachedRowsMixin, invalidate, invalidate_post
+from notifications.dispatch import notify
+from social_media_api.export import export_response
+from social_media_api.pagination import KeysetPagination
+from social_media_api.replicas import ReplicaReadMixin
+
+
+# Output name -> lookup for post exports
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'author': 'author__username',
+    'title': 'title',
+    'content': 'content',
+    'comments_count': 'comments_count',
+    'likes_count': 'likes_count',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+
+class PostViewSet(ReplicaReadMixin, CachedResponseMixin, viewsets.ModelViewSet):
     """
     CRUD operations for posts.
+    List and detail responses are cached (see posts/cache.py), support
+    conditional GET via ETag and are read from a replica when available.
     """
 
-    queryset = Post.objects.all().order_by('-created_at')
+    row_scope = 'post'
+
+    queryset = Post.objects.all().order_by('-created_at', '-id')
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
 
-    filter_backends = [filters.SearchFilter]
+    # Full-text search with ranking; plain SearchFilter on these fields
+    # when the database has no full-text index (see posts/search.py)
+    filter_backends = [PostSearchFilter]
     search_fields = ['title', 'content']
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+
+        # Push the new post into followers' materialized feeds
+        fan_out_post(post)
+        invalidate('posts')
+
+    def perform_update(self, serializer):
+        post = serializer.save()
+        # Edits can change which searches list the post
+        invalidate('posts', f'post:{post.pk}')
 
+    def perform_destroy(self, instance):
+        post_id = instance.pk
+        instance.delete()
+        invalidate('posts', f'post:{post_id}', f'comments:{post_id}')
 
-class CommentViewSet(viewsets.ModelViewSet):
+    def get_cache_scope(self, action):
+        if action == 'list':
+            return 'posts'
+        return f"post:{self.kwargs['pk']}"
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream all posts (or the ?search= matches) as NDJSON or CSV,
+        oldest first (see social_media_api/export.py).
+        """
+
+        queryset = self.filter_queryset(Post.objects.all())
+        if not request.query_params.get('search'):
+            queryset = queryset.order_by('id')
+        return export_response(request, queryset, EXPORT_COLUMNS, 'posts')
+
+
+class CommentViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     CRUD operations for comments.
+    Comment lists are cached per post (see posts/cache.py) and support
+    conditional GET via ETag.
     """
 
-    queryset = Comment.objects.all().order_by('created_at')
+    row_scope = 'comment'
+
+    queryset = Comment.objects.all().order_by('created_at', 'id')
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -56,72 +111,92 @@ class CommentViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(post_id=post_id)
         return queryset
 
+    def get_cache_scope(self, action):
+        if action == 'list':
+            return f"comments:{self.kwargs['post_id']}"
+        return None
+
     def perform_create(self, serializer):
         post_id = self.kwargs.get('post_id')
         post = get_object_or_404(Post, id=post_id)
 
-        serializer.save(
-            author=self.request.user,
-            post=post
-        )
+        with transaction.atomic():
+            serializer.save(
+                author=self.request.user,
+                post=post
+            )
+            Post.objects.filter(pk=post.pk).update(
+                comments_count=F('comments_count') + 1
+            )
 
-        # 🔔 Notification for post author
-        if post.author != self.request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=self.request.user,
-                verb='commented on your post',
-                content_type=ContentType.objects.get_for_model(post),
-                object_id=post.id
+            # 🔔 Notification for post author (queued, see notifications/dispatch.py)
+            if post.author_id != self.request.user.id:
+                notify(
+                    recipient_id=post.author_id,
+                    actor_id=self.request.user.id,
+                    verb='commented on your post',
+                    target=post
+                )
+
+            invalidate_post(post.pk, comments=True)
+
+    def perform_update(self, serializer):
+        comment = serializer.save()
+        invalidate(f'comment:{comment.pk}')
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            Post.objects.filter(pk=instance.post_id).update(
+                comments_count=F('comments_count') - 1
             )
+            invalidate_post(instance.post_id, comments=True)
 
 
-class FeedView(APIView):
+class FeedView(ReplicaReadMixin, CachedRowsMixin, generics.ListAPIView):
     """
     Generates a feed of posts from followed users.
+    Reads one page of the materialized feed (see posts/feed.py), from a
+    replica when available, and renders the posts from the row cache.
+    The ETag covers the page's posts, so a like or comment on any other
+    post still answers 304.
     """
 
+    serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = FeedPagination
+    row_scope = 'post'
 
-    def get(self, request):
-        following_users = request.user.following.all()
-
-        posts = Post.objects.filter(
-            author__in=following_users
-        ).order_by('-created_at')
+    def get_queryset(self):
+        return get_feed_entries(self.request.user)
 
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        links = {
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
+        }
+        return self.respond_rows(request, [item.id for item in page], links=links)
 
 
 class LikePostView(APIView):
     """
     Allows a user to like a post.
+    Idempotent: liking an already liked post returns 200.
     """
 
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        post = generics.get_object_or_404(Post, pk=pk)
+        created = likes.like(request.user.id, pk)
 
-        like, created = Like.objects.get_or_create(
-            user=request.user,
-            post=post
-        )
+        if created is None:
+            raise Http404
 
         if not created:
             return Response(
                 {"detail": "You already liked this post."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if post.author != request.user:
-            Notification.objects.create(
-                recipient=post.author,
-                actor=request.user,
-                verb='liked your post',
-                content_type=ContentType.objects.get_for_model(post),
-                object_id=post.id
+                status=status.HTTP_200_OK
             )
 
         return Response(
@@ -133,27 +208,51 @@ class LikePostView(APIView):
 class UnlikePostView(APIView):
     """
     Allows a user to unlike a post.
+    Idempotent: unliking a post that is not liked returns 200.
     """
 
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        post = generics.get_object_or_404(Post, pk=pk)
+        deleted = likes.unlike(request.user.id, pk)
 
-        like = Like.objects.filter(
-            user=request.user,
-            post=post
-        ).first()
+        if deleted is None:
+            raise Http404
 
-        if not like:
+        if not deleted:
             return Response(
                 {"detail": "You have not liked this post."},
-                status=status.HTTP_400_BAD_REQUEST
+                status=status.HTTP_200_OK
             )
 
-        like.delete()
-
         return Response(
             {"detail": "Post unliked."},
             status=status.HTTP_200_OK
         )
+
+
+class LikedPostsView(APIView):
+    """
+    "Liked by me" flags for a page of posts: GET /api/posts/liked/?ids=1,2,3
+    Post responses are shared between users (and cached), so clients fetch
+    these flags separately, one query per page.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            post_ids = [
+                int(value) for value in request.query_params.get('ids', '').split(',')
+                if value.strip()
+            ]
+        except ValueError:
+            raise ValidationError({"ids": "Expected a comma-separated list of post ids."})
+
+        if len(post_ids) > likes.MAX_IDS:
+            raise ValidationError({"ids": f"At most {likes.MAX_IDS} ids per request."})
+
+        liked = likes.liked_post_ids(request.user.id, post_ids) if post_ids else set()
+        return Response({
+            "liked": {str(post_id): post_id in liked for post_id in post_ids}
+        })
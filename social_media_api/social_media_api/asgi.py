@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
+# ASGI profile: pooled database connections (see DB_CONNECTIONS in settings)
+os.environ.setdefault('DB_CONNECTIONS', 'pool')
 
 application = get_asgi_application()
@@ -0,0 +1,60 @@
+"""
+Conditional GET support (ETag / If-None-Match).
+
+Views compute an ETag from cheap validators (cache versions, row counts,
+max timestamps) *before* building the response. When the client already
+has that version the view answers 304 Not Modified without querying or
+serializing the body.
+
+Only ETags are emitted: Last-Modified cannot see deletions or counter
+updates (likes, mark-as-read) that leave the newest timestamp unchanged.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from any reprable validator values.
+    """
+
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def conditional_get(request, etag, handler, *args, **kwargs):
+    """
+    Return 304 if the client's If-None-Match matches `etag`, otherwise call
+    `handler` and tag its response.
+    """
+
+    if etag is None or request.method not in ('GET', 'HEAD'):
+        return handler(request, *args, **kwargs)
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    response = handler(request, *args, **kwargs)
+    if response.status_code == 200:
+        response['ETag'] = etag
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Generic view mixin adding ETag / 304 support to `list` and `retrieve`.
+    Views implement get_etag(request); returning None disables it.
+    """
+
+    def get_etag(self, request):
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return conditional_get(request, self.get_etag(request), super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_get(request, self.get_etag(request), super().retrieve, *args, **kwargs)
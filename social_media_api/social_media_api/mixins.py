@@ -0,0 +1,44 @@
+"""
+Reusable view and serializer mixins shared across apps.
+"""
+
+
+class EagerLoadingMixin:
+    """
+    Serializer mixin that declares which relations its fields read.
+
+    Subclasses list the relations instead of each view remembering to call
+    select_related / prefetch_related, e.g.
+
+        select_related_fields = ('author',)
+        prefetch_related_fields = ('tags',)
+        annotations = {'likes': Count('likes')}
+    """
+
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    annotations = {}
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        if cls.annotations:
+            queryset = queryset.annotate(**cls.annotations)
+        return queryset
+
+
+class EagerLoadingViewMixin:
+    """
+    Generic view mixin that applies the serializer's eager loading to every
+    queryset the view reads (list, retrieve, update and destroy).
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
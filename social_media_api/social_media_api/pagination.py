@@ -0,0 +1,193 @@
+"""
+Keyset (cursor) pagination shared by every list endpoint.
+
+Instead of OFFSET, each page is fetched with a WHERE clause on the values of
+the last row seen, e.g. (created_at, id) < (last.created_at, last.id).
+Deep pages therefore cost the same as the first one, and rows inserted while
+a client is paging never shift or duplicate results.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the queryset's ordering.
+
+    The ordering is taken from the queryset's order_by() and must end with a
+    unique field; 'id' is appended automatically when it is missing.
+    Ordering fields must be non-null.
+    """
+
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Used when the queryset has no explicit order_by()
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        values, reverse = self.decode_cursor(request, queryset.model)
+        self.has_cursor = values is not None
+        self.reverse = reverse
+
+        ordering = self._flip(self.ordering) if reverse else self.ordering
+        results = self.fetch(queryset, ordering, values, self.page_size + 1)
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.has_cursor
+
+        self.page = results
+        return results
+
+    def fetch(self, queryset, ordering, values, limit):
+        """
+        The first `limit` rows in `ordering` after the cursor position
+        `values` (None on the first page).
+        """
+
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+        return list(queryset[:limit])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        ordering = [
+            field for field in queryset.query.order_by
+            if isinstance(field, str)
+        ] or list(self.ordering)
+
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    # Cursor encoding
+
+    def encode_cursor(self, obj, reverse):
+        position = [getattr(obj, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps({'v': position, 'r': reverse}, default=self._json_default)
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            values = payload['v']
+            reverse = bool(payload.get('r', False))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self._to_python(model, field.lstrip('-'), value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return values, reverse
+
+    @staticmethod
+    def _json_default(value):
+        # Full isoformat: DjangoJSONEncoder would truncate microseconds and
+        # make cursors skip or repeat rows created within the same millisecond
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    @staticmethod
+    def _to_python(model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. a search rank) are stored as plain JSON values
+            return value
+        try:
+            return field.to_python(value)
+        except Exception:
+            raise ValueError(name)
+
+    # Query building
+
+    @staticmethod
+    def _flip(ordering):
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in ordering
+        )
+
+    @staticmethod
+    def _after(ordering, values):
+        """
+        Lexicographic "comes after" filter for the given ordering:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
@@ -0,0 +1,191 @@
+"""
+Read replica routing.
+
+Every query goes to the primary ('default') unless the code runs inside
+replica_reads(), which picks one of settings.REPLICA_DATABASES for the
+rest of the block. Views opt in with ReplicaReadMixin (feed, post list and
+detail, notifications, profile); writes always go to the primary.
+
+Read-your-writes: after a user's successful write request,
+PrimaryPinMiddleware pins that user to the primary for
+REPLICA_PIN_SECONDS (stored in the shared cache, so every process sees
+it), longer than the replicas are expected to lag.
+
+Shared caches must not be refilled from a lagging replica right after a
+write invalidated them, or the stale value would outlive the lag. Cache
+fills therefore read inside primary() (see accounts/graph.py,
+accounts/hydration.py, notifications/unread.py and posts/cache.py).
+
+With no replicas configured everything here is a no-op. In tests each
+replica is a mirror of the primary (TEST MIRROR in settings).
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.permissions import SAFE_METHODS
+
+
+# Alias reads go to in the current context, or None for the primary
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """
+    Send the user's reads to the primary for the next REPLICA_PIN_SECONDS.
+    """
+
+    if settings.REPLICA_DATABASES:
+        cache.set(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+
+def enter_replica_reads():
+    """
+    Route reads to a replica until exit_replica_reads(token).
+    Returns the token, or None if there are no replicas.
+    """
+
+    if not settings.REPLICA_DATABASES:
+        return None
+    return _read_alias.set(random.choice(settings.REPLICA_DATABASES))
+
+
+def exit_replica_reads(token):
+    if token is not None:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    token = enter_replica_reads()
+    try:
+        yield
+    finally:
+        exit_replica_reads(token)
+
+
+@contextmanager
+def primary():
+    """
+    Read from the primary inside the block, even within replica_reads().
+    """
+
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def reading_from_replica():
+    return _read_alias.get() is not None
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router: reads follow the current context, writes go to the
+    primary. Replicas are never migrated (they copy the primary's schema).
+    """
+
+    def db_for_read(self, model, **hints):
+        # None keeps Django's default (the primary, or the database the
+        # related instance came from)
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primary and replicas hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+@receiver(connection_created)
+def read_uncommitted_test_mirror(sender, connection, **kwargs):
+    # An SQLite test mirror is a second connection to the primary's shared
+    # in-memory database. TestCase never commits, so let the mirror read
+    # uncommitted rows instead of failing with "table is locked".
+    if (
+        connection.vendor == 'sqlite'
+        and connection.alias in settings.REPLICA_DATABASES
+        and connection.is_in_memory_db()
+    ):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA read_uncommitted = 1')
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin: serve `replica_actions` (viewsets) or GET/HEAD (other
+    views) from a replica, unless the user is pinned to the primary.
+    """
+
+    replica_actions = ('list', 'retrieve')
+
+    def use_replica(self, request):
+        action = getattr(self, 'action', None)
+        if action is not None:
+            allowed = action in self.replica_actions
+        else:
+            allowed = request.method in ('GET', 'HEAD')
+
+        if not allowed or not settings.REPLICA_DATABASES:
+            return False
+        user = request.user
+        return not (user.is_authenticated and is_pinned(user.pk))
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and permission checks (in super) use the primary
+        super().initial(request, *args, **kwargs)
+        if self.use_replica(request):
+            self._replica_token = enter_replica_reads()
+
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # Also on unhandled exceptions, which skip finalize_response(),
+            # so the alias never leaks into later code on this thread
+            exit_replica_reads(self._replica_token)
+            self._replica_token = None
+
+
+class PrimaryPinMiddleware:
+    """
+    Pins the user to the primary after a successful write request
+    (read-your-writes). Logins pin in accounts.tokens.issue(), since the
+    user is not authenticated on that request yet.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            # DRF sets request.user on the underlying request once it authenticates
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+
+        return response
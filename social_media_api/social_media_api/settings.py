@@ -61,8 +61,9 @@ AUTH_USER_MODEL = 'accounts.User'
 # Django REST Framework global configuration
 REST_FRAMEWORK = {
     # Use token-based authentication for all API requests
+    # (token lookups are cached, see accounts/authentication.py)
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     # Require authentication by default (can be overridden per-view)
     'DEFAULT_PERMISSION_CLASSES': [
@@ -70,10 +71,94 @@ REST_FRAMEWORK = {
     ],
 }
 
+# API tokens (accounts.AuthToken): rotated on login, expire after
+# AUTH_TOKEN_MAX_AGE seconds since issue or AUTH_TOKEN_IDLE_TIMEOUT since
+# last use. last_used_at is written at most once per AUTH_TOKEN_TOUCH_INTERVAL.
+AUTH_TOKEN_MAX_AGE = int(os.environ.get('AUTH_TOKEN_MAX_AGE', str(90 * 24 * 3600)))
+AUTH_TOKEN_IDLE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_IDLE_TIMEOUT', str(30 * 24 * 3600)))
+AUTH_TOKEN_TOUCH_INTERVAL = int(os.environ.get('AUTH_TOKEN_TOUCH_INTERVAL', '300'))
+
+# Password hashing pool for login/register (see accounts/hashing.py).
+# 0 workers means one per CPU; beyond workers + max pending, requests get 503.
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', '0'))
+PASSWORD_HASHING_MAX_PENDING = int(os.environ.get('PASSWORD_HASHING_MAX_PENDING', '32'))
+# In-flight login/register requests allowed per client IP and per username
+AUTH_MAX_CONCURRENT_PER_IP = int(os.environ.get('AUTH_MAX_CONCURRENT_PER_IP', '4'))
+AUTH_MAX_CONCURRENT_PER_USERNAME = int(os.environ.get('AUTH_MAX_CONCURRENT_PER_USERNAME', '2'))
+# Client IP behind reverse proxies: the header they append to and how many
+# of them are trusted. Unset, REMOTE_ADDR is used (see accounts/limits.py).
+TRUSTED_PROXY_HEADER = os.environ.get('TRUSTED_PROXY_HEADER', '')
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+
+# Cached user cards embedded in posts, comments and notifications
+USER_CARD_CACHE_TIMEOUT = int(os.environ.get('USER_CARD_CACHE_TIMEOUT', '3600'))
+
+# Token lookup cache: seconds in the shared cache / in process memory.
+# The local TTL is how long another process may still accept a revoked token.
+TOKEN_CACHE_TIMEOUT = int(os.environ.get('TOKEN_CACHE_TIMEOUT', '300'))
+TOKEN_CACHE_LOCAL_TTL = int(os.environ.get('TOKEN_CACHE_LOCAL_TTL', '5'))
+TOKEN_CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('TOKEN_CACHE_LOCAL_MAX_ENTRIES', '10000'))
+
+# Home feed (fan-out-on-write)
+# Authors with more followers than this are not pushed into follower feeds;
+# their posts are pulled in at read time instead.
+FEED_FANOUT_MAX_FOLLOWERS = int(os.environ.get('FEED_FANOUT_MAX_FOLLOWERS', '5000'))
+# How many of a user's recent posts are copied into a new follower's feed
+FEED_BACKFILL_LIMIT = int(os.environ.get('FEED_BACKFILL_LIMIT', '200'))
+
+# Follow-graph adjacency cache (see accounts/graph.py)
+# Seconds an id list stays in the shared cache / in process memory
+FOLLOW_GRAPH_CACHE_TIMEOUT = int(os.environ.get('FOLLOW_GRAPH_CACHE_TIMEOUT', '3600'))
+FOLLOW_GRAPH_LOCAL_TTL = int(os.environ.get('FOLLOW_GRAPH_LOCAL_TTL', '5'))
+# Per-process entry limit, and the largest id list worth caching at all
+FOLLOW_GRAPH_LOCAL_MAX_ENTRIES = int(os.environ.get('FOLLOW_GRAPH_LOCAL_MAX_ENTRIES', '10000'))
+FOLLOW_GRAPH_MAX_CACHED_IDS = int(os.environ.get('FOLLOW_GRAPH_MAX_CACHED_IDS', '50000'))
+
+# Follow suggestions (see accounts/suggestions.py): entries kept per user,
+# and users following more accounts than this are ignored as the middle hop
+SUGGESTIONS_PER_USER = int(os.environ.get('SUGGESTIONS_PER_USER', '50'))
+SUGGESTIONS_MAX_HUB_FOLLOWING = int(os.environ.get('SUGGESTIONS_MAX_HUB_FOLLOWING', '5000'))
+
+# Post search: 'auto' uses the database's full-text index (PostgreSQL
+# tsvector or SQLite FTS5), 'none' falls back to DRF's SearchFilter
+POSTS_SEARCH_BACKEND = os.environ.get('POSTS_SEARCH_BACKEND', 'auto')
+
+# Notification dispatch (see notifications/dispatch.py)
+# Events are queued in the database and written in batches by
+# `python manage.py process_notifications`.
+NOTIFICATIONS_BATCH_SIZE = int(os.environ.get('NOTIFICATIONS_BATCH_SIZE', '500'))
+# Above this many pending events, requests help drain the queue themselves
+NOTIFICATIONS_MAX_BACKLOG = int(os.environ.get('NOTIFICATIONS_MAX_BACKLOG', '10000'))
+# Process events right after each request commits (no worker needed locally).
+# Off unless set explicitly, so a deploy missing DEBUG=False still queues.
+NOTIFICATIONS_EAGER = os.environ.get('NOTIFICATIONS_EAGER', 'False') == 'True'
+
+# Similar notifications (same recipient, verb and object) within this many
+# seconds are merged into one row instead of inserting a new one
+NOTIFICATIONS_AGGREGATION_WINDOW = int(os.environ.get('NOTIFICATIONS_AGGREGATION_WINDOW', '86400'))
+# Distinct actor ids remembered per merged notification; a repeat by an
+# actor older than that is counted again
+NOTIFICATIONS_TRACKED_ACTORS = int(os.environ.get('NOTIFICATIONS_TRACKED_ACTORS', '100'))
+# Unread notification counters are cached for this many seconds
+NOTIFICATIONS_UNREAD_CACHE_TTL = int(os.environ.get('NOTIFICATIONS_UNREAD_CACHE_TTL', '300'))
+# Read notifications older than this are removed by `purge_notifications`
+NOTIFICATIONS_RETENTION_DAYS = int(os.environ.get('NOTIFICATIONS_RETENTION_DAYS', '90'))
+
+# Rows fetched per database round trip by streaming exports
+# (see social_media_api/export.py)
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+
 # Media configuration (used for profile pictures)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Profile picture pipeline (see accounts/avatars.py)
+AVATAR_MAX_UPLOAD_SIZE = int(os.environ.get('AVATAR_MAX_UPLOAD_SIZE', str(5 * 1024 * 1024)))
+# Largest accepted width or height, checked from the image header
+AVATAR_MAX_DIMENSION = int(os.environ.get('AVATAR_MAX_DIMENSION', '4096'))
+# Threads rendering thumbnails; 0 renders right after the request commits
+AVATAR_WORKERS = int(os.environ.get('AVATAR_WORKERS', '2'))
+
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
@@ -84,6 +169,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Read-your-writes for replica reads (see social_media_api/replicas.py)
+    'social_media_api.replicas.PrimaryPinMiddleware',
 ]
 
 ROOT_URLCONF = 'social_media_api.urls'
@@ -111,14 +198,56 @@ WSGI_APPLICATION = 'social_media_api.wsgi.application'
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
+# How PostgreSQL connections are managed:
+# - 'persistent' (sync WSGI workers): each worker thread keeps its own
+#   connection for DB_CONN_MAX_AGE seconds, checked before it is reused.
+# - 'pool': a psycopg connection pool per process, DB_POOL_MIN_SIZE to
+#   DB_POOL_MAX_SIZE connections shared by all its threads. asgi.py selects
+#   this: under ASGI, sync ORM calls run on executor threads, so per-thread
+#   persistent connections multiply and are rarely reused.
+# Keep (processes x max connections each) below PostgreSQL's max_connections.
+DB_CONNECTIONS = os.environ.get("DB_CONNECTIONS", "persistent")
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "600"))
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
+# Seconds a request waits for a free pooled connection before failing
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
+
+def postgres_database(url):
+    """
+    PostgreSQL settings for `url` with the connection profile above.
+    """
+
+    database = dj_database_url.parse(
+        url,
+        conn_max_age=DB_CONN_MAX_AGE if DB_CONNECTIONS == "persistent" else 0,
+        # Ping a reused connection (persistent or pooled) before a request uses it
+        conn_health_checks=True,
+        ssl_require=True
+    )
+
+    if DB_CONNECTIONS == "pool":
+        # Django 5.1+ native pooling (psycopg 3 + psycopg_pool). With
+        # conn_health_checks, each connection is checked as it leaves the pool.
+        database["OPTIONS"]["pool"] = {
+            "min_size": DB_POOL_MIN_SIZE,
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": DB_POOL_TIMEOUT,
+        }
+
+    # Transaction-mode PgBouncer cannot keep the server-side cursors used by
+    # .iterator() (e.g. the exports) open across statements
+    database["DISABLE_SERVER_SIDE_CURSORS"] = (
+        os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS", "False") == "True"
+    )
+    return database
+
+
 if DATABASE_URL:
     # Production (Render / PostgreSQL)
     DATABASES = {
-        "default": dj_database_url.parse(
-            DATABASE_URL,
-            conn_max_age=600,
-            ssl_require=True
-        )
+        "default": postgres_database(DATABASE_URL)
     }
 else:
     # Local development (SQLite)
@@ -129,7 +258,58 @@ else:
         }
     }
 
+# Read replicas (see social_media_api/replicas.py): comma-separated database
+# URLs, added as 'replica1', 'replica2', ... Locally a copy of the SQLite
+# file can stand in for a replica, e.g.
+#   cp db.sqlite3 replica.sqlite3
+#   DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 python manage.py runserver
+REPLICA_DATABASES = []
+for number, url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")), 1):
+    alias = f"replica{number}"
+    url = url.strip()
+    DATABASES[alias] = dj_database_url.parse(url) if url.startswith("sqlite") else postgres_database(url)
+    # Tests read replicas through the primary's connection
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["social_media_api.replicas.PrimaryReplicaRouter"]
+
+# After a write, the user's reads stay on the primary this many seconds;
+# keep it above the replicas' expected lag
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "10"))
+
+
+# Cache
+# Redis is shared by every web and worker process. Locally, CACHE_DIR gives
+# a file cache shared by runserver and the workers; without it the cache is
+# per-process memory.
+REDIS_URL = os.environ.get("REDIS_URL")
+CACHE_DIR = os.environ.get("CACHE_DIR")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+elif CACHE_DIR:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": CACHE_DIR,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 
+# Seconds a cached post/comment response is kept (see posts/cache.py)
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', '300'))
 
 
 # Password validation
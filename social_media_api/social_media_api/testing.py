@@ -0,0 +1,57 @@
+"""
+Helpers shared by the apps' test suites.
+"""
+
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from accounts import graph
+
+
+class QueryCountGuardMixin:
+    """
+    TestCase mixin that catches N+1 queries on list endpoints.
+
+    It requests the same URL with a small and a large page size and fails if
+    the larger page needs more queries, i.e. if some field triggers a query
+    per serialized row.
+    """
+
+    # Read replicas (test mirrors) serve some list endpoints
+    databases = '__all__'
+
+    small_page_size = 1
+    large_page_size = 10
+
+    def count_queries(self, client, url, page_size):
+        # Measure the database path, not a cached response
+        cache.clear()
+        graph.clear_local()
+        separator = '&' if '?' in url else '?'
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in connections
+            ]
+            response = client.get(f'{url}{separator}page_size={page_size}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return sum(len(context.captured_queries) for context in contexts), response
+
+    def assertQueryCountConstant(self, client, url):
+        small, _ = self.count_queries(client, url, self.small_page_size)
+        large, response = self.count_queries(client, url, self.large_page_size)
+
+        self.assertEqual(
+            len(response.data['results']),
+            self.large_page_size,
+            'Not enough rows to fill the large page; create more test data.'
+        )
+        self.assertEqual(
+            small,
+            large,
+            f'{url} ran {small} queries for {self.small_page_size} row(s) '
+            f'but {large} for {self.large_page_size}: query count grows with page size.'
+        )
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from . import replicas
+
+User = get_user_model()
+
+
+@override_settings(REPLICA_DATABASES=['replica1', 'replica2'])
+class RouterTests(SimpleTestCase):
+    """
+    Reads follow the current context; writes always go to the primary.
+    """
+
+    router = replicas.PrimaryReplicaRouter()
+
+    def test_reads_and_writes(self):
+        self.assertIsNone(self.router.db_for_read(User))
+
+        with replicas.replica_reads():
+            self.assertIn(self.router.db_for_read(User), ['replica1', 'replica2'])
+            self.assertEqual(self.router.db_for_write(User), 'default')
+
+            with replicas.primary():
+                self.assertIsNone(self.router.db_for_read(User))
+            self.assertTrue(replicas.reading_from_replica())
+
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas(self):
+        with replicas.replica_reads():
+            self.assertIsNone(self.router.db_for_read(User))
+
+
+class AliasView(replicas.ReplicaReadMixin, APIView):
+    # Reports where reads would go; raises when asked to
+    def get(self, request):
+        error = request.query_params.get('raise')
+        if error == 'api':
+            raise NotFound()
+        if error == 'other':
+            raise RuntimeError('boom')
+        return Response({'alias': replicas._read_alias.get()})
+
+    post = get
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaReadMixinTests(TestCase):
+    """
+    Safe requests read from a replica unless the user just wrote, and the
+    alias never outlives the request.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user')
+
+    def request(self, method='get', query=''):
+        request = getattr(APIRequestFactory(), method)(f'/{query}')
+        force_authenticate(request, self.user)
+        return AliasView.as_view()(request)
+
+    def test_reads_use_replica(self):
+        self.assertEqual(self.request().data['alias'], 'replica1')
+        self.assertIsNone(self.request('post').data['alias'])
+        self.assertIsNone(replicas._read_alias.get())
+
+    def test_write_pins_user_to_primary(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post('/api/posts/', {'title': ''}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(replicas.is_pinned(self.user.pk))
+
+        response = client.post('/api/posts/', {'title': 'Hello', 'content': 'World'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(replicas.is_pinned(self.user.pk))
+        self.assertIsNone(self.request().data['alias'])
+
+    def test_alias_reset_after_exceptions(self):
+        self.assertEqual(self.request(query='?raise=api').status_code, 404)
+        self.assertIsNone(replicas._read_alias.get())
+
+        with self.assertRaises(RuntimeError):
+            self.request(query='?raise=other')
+        self.assertIsNone(replicas._read_alias.get())